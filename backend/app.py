@@ -11,14 +11,22 @@ from config import Config
 from auth import (register_user, login_user, get_current_user, get_current_user_details,
                   token_required, admin_required, soc_or_admin_required)
 from database import db
+from write_behind import get_write_buffer
 from email_service import email_service
+from upload_stream import UploadTooLarge, extract_upload, iter_mapped_lines, spool_upload
 from werkzeug.utils import secure_filename
 import secrets
 import string
+import socket
+import threading
+import time
+import zipfile
+from datetime import datetime, timedelta, timezone
 
 # Initialize Flask app
 app = Flask(__name__)
 app.config.from_object(Config)
+app.config['MAX_CONTENT_LENGTH'] = Config.MAX_UPLOAD_SIZE
 
 # Enable CORS
 CORS(app, resources={r"/*": {"origins": "*"}})
@@ -29,18 +37,125 @@ jwt = JWTManager(app)
 # Lazy load model to prevent blocking authentication
 _detector = None
 _preprocessor = None
+_model_lock = threading.Lock()
+_model_state = {'status': 'not_loaded', 'load_seconds': None, 'error': None}
 
 def get_model():
     """Lazy load the AI model only when needed"""
-    global _detector, _preprocessor
     if _detector is None:
-        print("Loading AI model (first time only)...")
+        # Waits here if a background load is already in progress
+        with _model_lock:
+            if _detector is None:
+                _load_model()
+    return _detector, _preprocessor
+
+def _load_model():
+    """Load and warm up the model, tracking state for readiness checks"""
+    global _detector, _preprocessor
+    print("Loading AI model (first time only)...")
+    _model_state['status'] = 'loading'
+    start = time.perf_counter()
+    try:
         from model.transformer_model import get_detector
         from model.preprocessor import preprocessor
-        _detector = get_detector()
-        _preprocessor = preprocessor
-        print("AI model loaded successfully!")
-    return _detector, _preprocessor
+        detector = get_detector()
+        detector.warm_up()
+    except Exception as e:
+        _model_state['status'] = 'failed'
+        _model_state['error'] = str(e)
+        raise
+    _preprocessor = preprocessor
+    _detector = detector
+    _model_state['load_seconds'] = round(time.perf_counter() - start, 3)
+    _model_state['status'] = 'ready'
+    _model_state['error'] = None
+    print(f"AI model loaded successfully in {_model_state['load_seconds']}s!")
+
+def _load_model_in_background():
+    """Start loading the model on a daemon thread"""
+    def run():
+        try:
+            get_model()
+        except Exception as e:
+            print(f"Background model load failed: {e}")
+    threading.Thread(target=run, name='model-loader', daemon=True).start()
+
+# The debug reloader's parent process never serves requests, and inference
+# workers re-import this file as __mp_main__, so background jobs skip both.
+_SERVING = __name__ != '__mp_main__' and not (
+    __name__ == '__main__' and Config.DEBUG and os.environ.get('WERKZEUG_RUN_MAIN') != 'true')
+
+if Config.MODEL_EAGER_LOAD and _SERVING:
+    _load_model_in_background()
+
+def _classify(detector, lines, sequences, logs=None):
+    """Predictions and template ids for a batch of log lines
+    
+    With template mining each template is classified once; otherwise every
+    sequence goes to the detector (across worker processes if enabled).
+    ``logs`` is the chunk size the lines were deduplicated from.
+    """
+    if Config.TEMPLATE_MINING:
+        from model.template_miner import get_template_classifier
+        return get_template_classifier(detector).classify(lines, sequences)
+    
+    from model.parallel_inference import predict_parallel
+    return predict_parallel(detector, sequences, logs), [None] * len(sequences)
+
+def _classify_deduplicated(detector, chunk, seen):
+    """_classify over a chunk of records, once per distinct sequence
+    
+    ``seen`` maps sequences already classified in this upload to their
+    prediction and is extended in place up to UPLOAD_DEDUP_MAX_SEQUENCES
+    entries. Each repeat gets its own copy of the prediction; template ids
+    are still mined per line, since lines with the same sequence can come
+    from different templates.
+    """
+    first = {}  # sequence -> index of its first unclassified record
+    for i, log in enumerate(chunk):
+        if log['sequence'] not in seen:
+            first.setdefault(log['sequence'], i)
+    
+    predictions = [None] * len(chunk)
+    template_ids = [None] * len(chunk)
+    classified = {}
+    if first:
+        indices = list(first.values())
+        results, ids = _classify(detector, [chunk[i]['original'] for i in indices], list(first),
+                                 logs=len(chunk))
+        for i, result, template_id in zip(indices, results, ids):
+            predictions[i], template_ids[i] = result, template_id
+        classified = dict(zip(first, results))
+        
+        room = Config.UPLOAD_DEDUP_MAX_SEQUENCES - len(seen)
+        if room > 0:
+            seen.update(list(classified.items())[:room])
+    
+    repeats = [i for i, prediction in enumerate(predictions) if prediction is None]
+    for i in repeats:
+        sequence = chunk[i]['sequence']
+        predictions[i] = dict(seen.get(sequence) or classified[sequence])
+    
+    if repeats and Config.TEMPLATE_MINING:
+        from model.template_miner import get_template_classifier
+        ids = get_template_classifier(detector).template_ids(
+            [chunk[i]['original'] for i in repeats], [chunk[i]['sequence'] for i in repeats]
+        )
+        for i, template_id in zip(repeats, ids):
+            template_ids[i] = template_id
+    
+    return predictions, template_ids, len(first)
+
+def _chunked(iterable, size):
+    """Yield lists of up to ``size`` items from any iterable"""
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
 
 # Create upload folder
 os.makedirs(Config.UPLOAD_FOLDER, exist_ok=True)
@@ -186,16 +301,25 @@ def analyze_text():
         sequence = prep.extract_sequence(text)
         
         # Predict
-        result = detector.predict(sequence)
+        if Config.TEMPLATE_MINING:
+            results, template_ids = _classify(detector, [text], [sequence])
+            result, template_id = results[0], template_ids[0]
+        else:
+            result, template_id = detector.predict(sequence), None
         
-        # Save to database
-        log_id = db.save_log(
-            event=text,
-            sequence=sequence,
-            prediction=result['prediction'],
-            score=result['score'],
-            user_email=email
-        )
+        # Save to database (queued for a background bulk insert in write-behind mode)
+        log = {
+            'event': text,
+            'sequence': sequence,
+            'prediction': result['prediction'],
+            'score': result['score'],
+            'user_email': email,
+            'template_id': template_id
+        }
+        if Config.WRITE_BEHIND_ENABLED:
+            log_id = get_write_buffer(db).submit(**log)
+        else:
+            log_id = db.save_log(**log)
         
         # Send email alert for suspicious/malicious logs
         if result['prediction'] in ['suspicious', 'malicious']:
@@ -214,7 +338,9 @@ def analyze_text():
             'sequence': sequence,
             'prediction': result['prediction'],
             'score': result['score'],
-            'probabilities': result['probabilities']
+            'probabilities': result['probabilities'],
+            'decided_by': result['decided_by'],
+            'template_id': template_id
         }), 200
     except Exception as e:
         print(f"Error analyzing text: {e}")
@@ -223,7 +349,16 @@ def analyze_text():
 @app.route('/api/analyze/file', methods=['POST'])
 @token_required
 def analyze_file():
-    """Analyze uploaded log file"""
+    """Analyze uploaded log file
+    
+    Size limits are enforced before anything is classified or saved: the
+    declared Content-Length first, then the spooled copy, then the
+    decompressed size of compressed uploads, which are decompressed once
+    into files next to the spool.
+    """
+    if request.content_length is not None and request.content_length > Config.MAX_UPLOAD_SIZE:
+        return jsonify({'success': False, 'message': f'Upload exceeds {Config.MAX_UPLOAD_SIZE} bytes'}), 413
+    
     if 'file' not in request.files:
         return jsonify({'success': False, 'message': 'No file uploaded'}), 400
     
@@ -233,112 +368,189 @@ def analyze_file():
         return jsonify({'success': False, 'message': 'No file selected'}), 400
     
     email = get_current_user()
+    path = None
+    files = []
+    analyzed = False
     
     try:
         # Get model (lazy load)
         detector, prep = get_model()
         
-        # Read file content
-        content = file.read().decode('utf-8')
-        
-        # Determine file type
-        filename = secure_filename(file.filename)
-        is_csv = filename.endswith('.csv')
-        
-        # Process logs
-        if is_csv:
-            logs = prep.process_csv(content)
-        else:
-            logs = prep.process_log_file(content)
-        
-        if not logs:
-            return jsonify({'success': False, 'message': 'No valid logs found'}), 400
+        # Spool to disk, then stream preprocessed records from the spooled file
+        filename = secure_filename(file.filename) or 'upload'
+        path = spool_upload(file, filename)
+        files = extract_upload(path, filename)
+        records = _iter_upload_records(prep, files)
         
-        # Analyze each log
+        statistics = {'normal': 0, 'suspicious': 0, 'malicious': 0}
         results = []
+        total = 0
+        alerts_sent = 0
+        seen = {}
+        classified = 0
         
-        for log in logs[:100]:  # Limit to 100 logs
-            sequence = log['sequence']
-            prediction = detector.predict(sequence)
-            
-            # Save to database
-            log_id = db.save_log(
-                event=log['original'],
-                sequence=sequence,
-                prediction=prediction['prediction'],
-                score=prediction['score'],
-                user_email=email
-            )
+        # Analyze in bounded chunks (across worker processes if enabled)
+        for chunk in _chunked(records, Config.ANALYZE_CHUNK_SIZE):
+            if Config.UPLOAD_DEDUP:
+                predictions, template_ids, unique = _classify_deduplicated(detector, chunk, seen)
+            else:
+                predictions, template_ids = _classify(
+                    detector, [log['original'] for log in chunk], [log['sequence'] for log in chunk]
+                )
+                unique = len(chunk)
+            classified += unique
             
-            # Send email alert for suspicious/malicious logs
-            if prediction['prediction'] in ['suspicious', 'malicious']:
-                email_service.send_alert_email({
+            # Save to database, one bulk insert per chunk
+            log_ids = db.save_logs_bulk([
+                {
                     'event': log['original'],
-                    'sequence': sequence,
+                    'sequence': log['sequence'],
                     'prediction': prediction['prediction'],
                     'score': prediction['score'],
-                    'user_email': email
-                })
+                    'user_email': email,
+                    'template_id': template_id,
+                    'source': _source_span(log)
+                }
+                for log, prediction, template_id in zip(chunk, predictions, template_ids)
+            ])
             
-            results.append({
-                'log_id': log_id,
-                'original': log['original'],
-                'sequence': sequence,
-                'prediction': prediction['prediction'],
-                'score': prediction['score']
-            })
+            for log, prediction, template_id, log_id in zip(chunk, predictions, template_ids, log_ids):
+                sequence = log['sequence']
+                
+                # Send email alert for suspicious/malicious logs
+                if prediction['prediction'] in ['suspicious', 'malicious'] and \
+                        alerts_sent < Config.MAX_ALERTS_PER_UPLOAD:
+                    email_service.send_alert_email({
+                        'event': log['original'],
+                        'sequence': sequence,
+                        'prediction': prediction['prediction'],
+                        'score': prediction['score'],
+                        'user_email': email
+                    })
+                    alerts_sent += 1
+                
+                statistics[prediction['prediction']] += 1
+                
+                # Only the first results are echoed back; counts cover the whole file
+                if len(results) < Config.ANALYZE_MAX_RESULTS:
+                    results.append({
+                        'log_id': log_id,
+                        'original': log['original'],
+                        'sequence': sequence,
+                        'prediction': prediction['prediction'],
+                        'score': prediction['score'],
+                        'decided_by': prediction['decided_by'],
+                        'template_id': template_id
+                    })
+            
+            total += len(chunk)
         
-        # Calculate statistics
-        normal_count = sum(1 for r in results if r['prediction'] == 'normal')
-        suspicious_count = sum(1 for r in results if r['prediction'] == 'suspicious')
-        malicious_count = sum(1 for r in results if r['prediction'] == 'malicious')
+        if not total:
+            return jsonify({'success': False, 'message': 'No valid logs found'}), 400
         
+        analyzed = True
         return jsonify({
             'success': True,
-            'total_logs': len(results),
-            'statistics': {
-                'normal': normal_count,
-                'suspicious': suspicious_count,
-                'malicious': malicious_count
-            },
-            'results': results
+            'total_logs': total,
+            'statistics': statistics,
+            'results': results,
+            'results_truncated': total > len(results),
+            'classified_sequences': classified,
+            'dedup_ratio': round(total / classified, 2)
         }), 200
         
+    except UploadTooLarge as e:
+        return jsonify({'success': False, 'message': str(e)}), 413
+    except (OSError, EOFError, zipfile.BadZipFile) as e:
+        return jsonify({'success': False, 'message': f'Corrupt or unreadable file: {str(e)}'}), 400
     except Exception as e:
         return jsonify({'success': False, 'message': f'Error processing file: {str(e)}'}), 500
+    finally:
+        # Failed uploads are never kept
+        if not (analyzed and Config.KEEP_UPLOADS):
+            for leftover in {path, *(member_path for _, member_path in files)}:
+                if leftover and os.path.exists(leftover):
+                    os.remove(leftover)
+
+def _iter_upload_records(prep, files):
+    """Preprocessed records for every (filename, path) extracted from an upload
+    
+    Each file is parsed as CSV or plain text by its own name and read
+    through a memory map, so records carry the file and byte span of their
+    source line. Fast-mode CSV goes through the columnar reader instead.
+    """
+    for name, path in files:
+        if name.lower().endswith('.csv') and Config.CSV_FAST_MODE:
+            with open(path, 'rb') as stream:
+                yield from prep.iter_csv_columnar(stream)
+            continue
+        
+        if name.lower().endswith('.csv'):
+            records = prep.iter_csv_spans(iter_mapped_lines(path))
+        else:
+            records = prep.iter_log_spans(iter_mapped_lines(path))
+        for record in records:
+            record['file'] = os.path.basename(path)
+            yield record
+
+def _source_span(log):
+    """Where a record came from in the kept upload, if known"""
+    if not Config.KEEP_UPLOADS or 'offset' not in log:
+        return None
+    return {'file': log['file'], 'offset': log['offset'], 'length': log['length']}
 
 # ==================== LOG RETRIEVAL ROUTES ====================
 
+# Fields a listing may be limited to with ?fields=
+LOG_LIST_FIELDS = ['event', 'sequence', 'prediction', 'score', 'timestamp', 'user_email', 'template_id', 'source']
+
+def _logs_page(default_limit, **filters):
+    """Paged log listing response
+    
+    Query parameters: ``limit`` (at most LOG_PAGE_MAX_LIMIT), ``cursor``
+    (the ``next_cursor`` of the previous page) and ``fields``
+    (comma-separated, e.g. ``prediction,score`` to skip event text).
+    """
+    limit = min(max(request.args.get('limit', default_limit, type=int), 1), Config.LOG_PAGE_MAX_LIMIT)
+    cursor = request.args.get('cursor') or None
+    
+    fields = None
+    if request.args.get('fields'):
+        fields = [field for field in request.args['fields'].split(',') if field]
+        unknown = [field for field in fields if field not in LOG_LIST_FIELDS]
+        if unknown:
+            return jsonify({'success': False, 'message': f'Unknown fields: {", ".join(unknown)}'}), 400
+    
+    try:
+        logs, next_cursor = db.get_logs_page(limit=limit, cursor=cursor, fields=fields, **filters)
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    
+    return jsonify({'success': True, 'logs': logs, 'next_cursor': next_cursor}), 200
+
 @app.route('/api/logs', methods=['GET'])
 @soc_or_admin_required
 def get_logs():
     """Get all logs (SOC/Admin only)"""
-    limit = request.args.get('limit', 100, type=int)
-    logs = db.get_all_logs(limit)
-    return jsonify({'success': True, 'logs': logs}), 200
+    return _logs_page(100)
 
 @app.route('/api/logs/me', methods=['GET'])
 @token_required
 def get_my_logs():
     """Get logs for current user"""
     email = get_current_user()
-    limit = request.args.get('limit', 100, type=int)
+    prediction = request.args.get('prediction')
+    if prediction is not None and prediction not in ['normal', 'suspicious', 'malicious']:
+        return jsonify({'success': False, 'message': 'Invalid prediction type'}), 400
     
     # Get user's logs only
-    from pymongo import DESCENDING
-    logs = list(db.logs.find({'user_email': email}).sort('timestamp', DESCENDING).limit(limit))
-    for log in logs:
-        log['_id'] = str(log['_id'])
-    
-    return jsonify({'success': True, 'logs': logs}), 200
+    return _logs_page(100, user_email=email, prediction=prediction)
 
 @app.route('/api/logs/malicious', methods=['GET'])
 @soc_or_admin_required
 def get_malicious_logs():
     """Get malicious logs only (SOC/Admin only)"""
-    limit = request.args.get('limit', 50, type=int)
-    logs = db.get_malicious_logs(limit)
-    return jsonify({'success': True, 'logs': logs}), 200
+    return _logs_page(50, prediction='malicious')
 
 @app.route('/api/logs/filter/<prediction>', methods=['GET'])
 @soc_or_admin_required
@@ -347,9 +559,7 @@ def get_logs_by_prediction(prediction):
     if prediction not in ['normal', 'suspicious', 'malicious']:
         return jsonify({'success': False, 'message': 'Invalid prediction type'}), 400
     
-    limit = request.args.get('limit', 100, type=int)
-    logs = db.get_logs_by_prediction(prediction, limit)
-    return jsonify({'success': True, 'logs': logs}), 200
+    return _logs_page(100, prediction=prediction)
 
 @app.route('/api/statistics', methods=['GET'])
 @token_required
@@ -362,21 +572,54 @@ def get_statistics():
         stats = db.get_statistics()
     else:
         # Normal user sees only their stats
-        email = get_current_user()
-        total = db.logs.count_documents({'user_email': email})
-        normal = db.logs.count_documents({'user_email': email, 'prediction': 'normal'})
-        suspicious = db.logs.count_documents({'user_email': email, 'prediction': 'suspicious'})
-        malicious = db.logs.count_documents({'user_email': email, 'prediction': 'malicious'})
-        
-        stats = {
-            'total': total,
-            'normal': normal,
-            'suspicious': suspicious,
-            'malicious': malicious
-        }
+        stats = db.get_statistics(user_email=get_current_user())
     
     return jsonify({'success': True, 'statistics': stats}), 200
 
+def _parse_time(value):
+    """ISO 8601 timestamp as a naive UTC datetime"""
+    parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+@app.route('/api/statistics/timeseries', methods=['GET'])
+@token_required
+def get_statistics_timeseries():
+    """Threat counts over time from the rollups
+    
+    Query parameters: ``start``/``end`` (ISO 8601, default the last 24
+    hours) and ``granularity`` (minute, hour or day). Admin/SOC may pass
+    ``user_email``; normal users always get their own series.
+    """
+    granularity = request.args.get('granularity', 'hour')
+    if granularity not in ['minute', 'hour', 'day']:
+        return jsonify({'success': False, 'message': 'Invalid granularity'}), 400
+    
+    try:
+        end = _parse_time(request.args['end']) if request.args.get('end') else datetime.utcnow()
+        start = _parse_time(request.args['start']) if request.args.get('start') else end - timedelta(days=1)
+    except ValueError:
+        return jsonify({'success': False, 'message': 'Invalid start or end time'}), 400
+    
+    step = {'minute': 60, 'hour': 3600, 'day': 86400}[granularity]
+    if start >= end:
+        return jsonify({'success': False, 'message': 'start must be before end'}), 400
+    if (end - start).total_seconds() / step > Config.TIMESERIES_MAX_BUCKETS:
+        return jsonify({
+            'success': False,
+            'message': f'Range too long for {granularity} granularity (max {Config.TIMESERIES_MAX_BUCKETS} buckets)'
+        }), 400
+    
+    user_details = get_current_user_details()
+    if user_details['role'] in ['admin', 'soc_analyst']:
+        user_email = request.args.get('user_email') or None
+    else:
+        user_email = get_current_user()
+    
+    series = db.get_timeseries(start, end, granularity, user_email)
+    return jsonify({'success': True, 'granularity': granularity, 'series': series}), 200
+
 # ==================== ADMIN ROUTES ====================
 
 @app.route('/api/logs/<log_id>', methods=['DELETE'])
@@ -394,8 +637,7 @@ def delete_log(log_id):
 def clear_all_logs():
     """Clear all logs from database (admin only)"""
     try:
-        result = db.logs.delete_many({})
-        count = result.deleted_count
+        count = db.clear_all_logs()
         return jsonify({
             'success': True, 
             'message': f'Successfully deleted {count} logs',
@@ -412,23 +654,117 @@ def clear_logs():
     count = db.clear_all_logs()
     return jsonify({'success': True, 'message': f'{count} logs deleted'}), 200
 
+_purge_lock = threading.Lock()
+_purge_state = {'status': 'idle', 'before': None, 'deleted': 0, 'batches': 0, 'estimated_total': None,
+                'started_at': None, 'finished_at': None, 'error': None}
+
+def _begin_purge(before):
+    """Mark a purge as running; False if one already is"""
+    with _purge_lock:
+        if _purge_state['status'] == 'running':
+            return False
+        _purge_state.update(status='running', before=before, deleted=0, batches=0, estimated_total=None,
+                            started_at=datetime.utcnow(), finished_at=None, error=None)
+        return True
+
+def _run_purge(before):
+    try:
+        db.purge_logs(before, progress=_purge_state)
+        _purge_state['status'] = 'done'
+    except Exception as e:
+        print(f"Error purging logs: {e}")
+        _purge_state['status'] = 'failed'
+        _purge_state['error'] = str(e)
+    _purge_state['finished_at'] = datetime.utcnow()
+
+def _retention_loop():
+    """Purge logs older than LOG_RETENTION_DAYS every RETENTION_INTERVAL_MINUTES
+    
+    Retention goes through the batched purge rather than a TTL index so
+    statistics and time series stay in step with the stored logs. Only the
+    process holding the lease purges.
+    """
+    owner = f'{socket.gethostname()}:{os.getpid()}'
+    interval = Config.RETENTION_INTERVAL_MINUTES * 60
+    while True:
+        try:
+            if db.acquire_lease('log-retention', interval * 2, owner):
+                before = datetime.utcnow() - timedelta(days=Config.LOG_RETENTION_DAYS)
+                if _begin_purge(before):
+                    _run_purge(before)
+        except Exception as e:
+            print(f"Error applying log retention: {e}")
+        time.sleep(interval)
+
+@app.route('/api/admin/logs/purge', methods=['POST'])
+@admin_required
+def purge_logs():
+    """Start a background purge of old logs (admin only)
+    
+    JSON body: {"before": ISO 8601} deletes logs older than that time in
+    throttled batches; without it every log is purged the same way. As
+    with LOG_RETENTION_DAYS, purged logs are taken out of the statistics
+    and time series. Use DELETE /api/logs/clear/all for an instant full
+    reset.
+    """
+    data = request.get_json(silent=True) or {}
+    try:
+        before = _parse_time(data['before']) if data.get('before') else None
+    except ValueError:
+        return jsonify({'success': False, 'message': 'Invalid before time'}), 400
+    
+    if not _begin_purge(before):
+        return jsonify({'success': False, 'message': 'A purge is already running', 'purge': _purge_state}), 409
+    
+    threading.Thread(target=_run_purge, args=(before,), name='log-purge', daemon=True).start()
+    return jsonify({'success': True, 'message': 'Purge started', 'purge': _purge_state}), 202
+
+@app.route('/api/admin/logs/purge', methods=['GET'])
+@admin_required
+def get_purge_progress():
+    """Progress of the current or last purge (admin only)"""
+    return jsonify({'success': True, 'purge': _purge_state}), 200
+
 # ==================== HEALTH CHECK ====================
 
 @app.route('/api/health', methods=['GET'])
+@app.route('/api/health/live', methods=['GET'])
 def health_check():
-    """Health check endpoint"""
+    """Liveness check: the API process is up"""
     return jsonify({
         'success': True,
         'message': 'Cyber Threat Detection API is running',
         'model': Config.MODEL_NAME
     }), 200
 
+@app.route('/api/health/ready', methods=['GET'])
+def readiness_check():
+    """Readiness check: with eager loading, ready once the model is warmed up"""
+    if Config.MODEL_EAGER_LOAD:
+        ready = _model_state['status'] == 'ready'
+    else:
+        ready = _model_state['status'] != 'failed'
+    
+    return jsonify({
+        'success': ready,
+        'ready': ready,
+        'model': {
+            'name': Config.MODEL_NAME,
+            'eager_load': Config.MODEL_EAGER_LOAD,
+            **_model_state
+        }
+    }), 200 if ready else 503
+
 # ==================== ERROR HANDLERS ====================
 
 @app.errorhandler(404)
 def not_found(error):
     return jsonify({'success': False, 'message': 'Endpoint not found'}), 404
 
+@app.errorhandler(413)
+def request_too_large(error):
+    return jsonify({'success': False, 'message': f'Upload exceeds {Config.MAX_UPLOAD_SIZE} bytes'}), 413
+
 @app.errorhandler(500)
 def internal_error(error):
     return jsonify({'success': False, 'message': 'Internal server error'}), 500
@@ -455,8 +791,102 @@ def get_email_config():
         'smtp_port': email_service.smtp_port
     }), 200
 
+# ==================== MODEL METRICS ====================
+
+@app.route('/api/admin/model/stats', methods=['GET'])
+@admin_required
+def get_model_stats():
+    """Get inference statistics for the loaded model (admin only)"""
+    if _detector is None:
+        return jsonify({'success': True, 'loaded': False}), 200
+    
+    return jsonify({
+        'success': True,
+        'loaded': True,
+        'backend': _detector.backend,
+        'quantized': _detector.quantized,
+        'token_lengths': _detector.get_token_length_stats(),
+        'tiers': _detector.get_tier_stats(),
+        'encoder': _detector.get_encoder_stats(),
+        'cache': _detector.get_cache_stats(),
+        'micro_batching': _detector.get_batcher_stats(),
+        'templates': _get_template_stats()
+    }), 200
+
+def _get_template_stats():
+    """Template mining counters (None when disabled or not yet used)"""
+    from model import template_miner
+    if template_miner.template_classifier is None:
+        return None
+    return template_miner.template_classifier.get_stats()
+
+@app.route('/api/admin/model/cache', methods=['GET'])
+@admin_required
+def get_prediction_cache_stats():
+    """Get prediction cache counters (admin only)"""
+    if _detector is None:
+        return jsonify({'success': True, 'loaded': False}), 200
+    return jsonify({'success': True, 'loaded': True, 'cache': _detector.get_cache_stats()}), 200
+
+@app.route('/api/admin/model/cache', methods=['DELETE'])
+@admin_required
+def clear_prediction_cache():
+    """Invalidate cached predictions (admin only)"""
+    from model import template_miner
+    if _detector is not None:
+        _detector.invalidate_cache(Config.MODEL_PATH)
+    if template_miner.template_classifier is not None:
+        template_miner.template_classifier.clear_results()
+    return jsonify({'success': True, 'message': 'Prediction cache cleared'}), 200
+
+# ==================== DATABASE METRICS ====================
+
+@app.route('/api/admin/db/stats', methods=['GET'])
+@admin_required
+def get_db_stats():
+    """Get database write-path statistics (admin only)"""
+    import write_behind
+    return jsonify({
+        'success': True,
+        'connected': db.connected,
+        'retention_days': Config.LOG_RETENTION_DAYS or None,
+        'write_behind': write_behind.write_buffer.get_stats() if write_behind.write_buffer else None
+    }), 200
+
+@app.route('/api/admin/db/counters/rebuild', methods=['POST'])
+@admin_required
+def rebuild_log_counters():
+    """Recompute statistics counters from the logs (admin only)"""
+    if not db.connected:
+        return jsonify({'success': False, 'message': 'Database not connected'}), 503
+    count = db.rebuild_counters()
+    return jsonify({'success': True, 'message': f'Rebuilt {count} counters'}), 200
+
+@app.route('/api/admin/db/rollups/backfill', methods=['POST'])
+@admin_required
+def backfill_log_rollups():
+    """Rebuild time series rollups from the logs (admin only)
+    
+    Optional JSON body: {"start": ISO 8601, "end": ISO 8601}.
+    """
+    if not db.connected:
+        return jsonify({'success': False, 'message': 'Database not connected'}), 503
+    
+    data = request.get_json(silent=True) or {}
+    try:
+        start = _parse_time(data['start']) if data.get('start') else None
+        end = _parse_time(data['end']) if data.get('end') else None
+    except ValueError:
+        return jsonify({'success': False, 'message': 'Invalid start or end time'}), 400
+    
+    count = db.backfill_rollups(start, end)
+    return jsonify({'success': True, 'message': f'Wrote {count} rollups'}), 200
+
 # ==================== STARTUP ====================
 
+if Config.LOG_RETENTION_DAYS and _SERVING:
+    threading.Thread(target=_retention_loop, name='log-retention', daemon=True).start()
+
 if __name__ == "__main__":
     print("-" * 60)
     print("🛡️  Cyber Threat Detection System - Backend Server")
@@ -465,7 +895,10 @@ if __name__ == "__main__":
     print(f"📧 Alerts: {'Enabled' if email_service.enabled else 'Disabled'}")
     print("-" * 60)
     print("🧠 Loading Transformer model...")
-    print("✓ Model loading skipped on startup (lazy loading enabled)")
+    if Config.MODEL_EAGER_LOAD:
+        print("✓ Model loading in background (see /api/health/ready)")
+    else:
+        print("✓ Model loading skipped on startup (lazy loading enabled)")
     print("=" * 60)
     
     app.run(debug=Config.DEBUG, host='0.0.0.0', port=5000)
@@ -0,0 +1,26 @@
+"""
+Build the time series rollups from existing logs
+Run this once after upgrading, or with a range to repair part of the history:
+    python backfill_rollups.py [start] [end]    (ISO 8601, e.g. 2024-05-01)
+"""
+
+from datetime import datetime
+from database import db
+import sys
+
+if __name__ == '__main__':
+    print("=" * 50)
+    print("Backfilling Log Rollups")
+    print("=" * 50)
+    
+    if not db.connected:
+        print("✗ Database not connected")
+        sys.exit(1)
+    
+    start = datetime.fromisoformat(sys.argv[1]) if len(sys.argv) > 1 else None
+    end = datetime.fromisoformat(sys.argv[2]) if len(sys.argv) > 2 else None
+    print(f"Range: {start or 'beginning'} -> {end or 'now'}")
+    
+    count = db.backfill_rollups(start, end)
+    print(f"✓ Wrote {count} rollups")
+    print("=" * 50)
@@ -5,6 +5,9 @@ from dotenv import load_dotenv
 # Load environment variables from .env file
 load_dotenv()
 
+# Model file paths are resolved against the backend directory
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
 class Config:
     """Application configuration"""
     
@@ -19,10 +22,80 @@ class Config:
     # MongoDB
     MONGO_URI = os.getenv('MONGO_URI', 'mongodb://localhost:27017/')
     MONGO_DB_NAME = os.getenv('MONGO_DB_NAME', 'cyber_threat_detection')
+    DB_BULK_CHUNK_SIZE = int(os.getenv('DB_BULK_CHUNK_SIZE', '1000'))  # documents per insert_many
+    LOG_PAGE_MAX_LIMIT = int(os.getenv('LOG_PAGE_MAX_LIMIT', '1000'))  # logs per listing page
+    TIMESERIES_MAX_BUCKETS = int(os.getenv('TIMESERIES_MAX_BUCKETS', '5000'))  # points per time series request
+    LOG_RETENTION_DAYS = int(os.getenv('LOG_RETENTION_DAYS', '0'))  # purge older logs, 0 = keep forever
+    RETENTION_INTERVAL_MINUTES = int(os.getenv('RETENTION_INTERVAL_MINUTES', '60'))  # between retention purges
+    PURGE_BATCH_SIZE = int(os.getenv('PURGE_BATCH_SIZE', '5000'))
+    PURGE_PAUSE_MS = int(os.getenv('PURGE_PAUSE_MS', '100'))  # pause between purge batches
+    WRITE_BEHIND_ENABLED = os.getenv('WRITE_BEHIND_ENABLED', 'False') == 'True'  # async single-log saves
+    WRITE_BEHIND_MAX_QUEUE = int(os.getenv('WRITE_BEHIND_MAX_QUEUE', '10000'))
+    WRITE_BEHIND_BATCH_SIZE = int(os.getenv('WRITE_BEHIND_BATCH_SIZE', '500'))
+    WRITE_BEHIND_FLUSH_MS = int(os.getenv('WRITE_BEHIND_FLUSH_MS', '200'))
     
     # Model
     MODEL_NAME = os.getenv('MODEL_NAME', 'distilbert-base-uncased')
+    # Fine-tuned weights (train_model.py writes here)
+    MODEL_PATH = os.path.join(BASE_DIR, os.getenv('MODEL_PATH', 'model/threat_detection_model.pth'))
     MAX_SEQ_LENGTH = int(os.getenv('MAX_SEQ_LENGTH', '128'))
+    MODEL_EAGER_LOAD = os.getenv('MODEL_EAGER_LOAD', 'False') == 'True'  # load + warm up at startup
+    INFERENCE_BATCH_SIZE = int(os.getenv('INFERENCE_BATCH_SIZE', '32'))
+    FAST_TOKENIZER = os.getenv('FAST_TOKENIZER', 'True') == 'True'  # memoized per-word WordPiece ids
+    FAST_TOKENIZER_MAX_WORDS = int(os.getenv('FAST_TOKENIZER_MAX_WORDS', '50000'))
+    DYNAMIC_PADDING = os.getenv('DYNAMIC_PADDING', 'True') == 'True'
+    LENGTH_BUCKETS = [int(b) for b in os.getenv('LENGTH_BUCKETS', '16,32,64,128').split(',')]
+    
+    # Inference backend: 'torch' or 'onnx'
+    INFERENCE_BACKEND = os.getenv('INFERENCE_BACKEND', 'torch')
+    ONNX_MODEL_PATH = os.path.join(BASE_DIR, os.getenv('ONNX_MODEL_PATH', 'model/threat_detection_model.onnx'))
+    ONNX_NUM_THREADS = int(os.getenv('ONNX_NUM_THREADS', '0'))  # 0 = onnxruntime default
+    
+    # Int8 dynamic quantization (requires a passing quantization gate report)
+    QUANTIZE_INT8 = os.getenv('QUANTIZE_INT8', 'False') == 'True'
+    QUANTIZATION_REPORT = os.path.join(BASE_DIR, os.getenv('QUANTIZATION_REPORT', 'model/quantization_report.json'))
+    QUANTIZATION_MIN_AGREEMENT = float(os.getenv('QUANTIZATION_MIN_AGREEMENT', '0.98'))
+    
+    # Heuristic-first cascade
+    CASCADE_ENABLED = os.getenv('CASCADE_ENABLED', 'False') == 'True'
+    CASCADE_AUDIT_RATE = float(os.getenv('CASCADE_AUDIT_RATE', '0.05'))
+    
+    # Prediction cache (0 disables)
+    PREDICTION_CACHE_SIZE = int(os.getenv('PREDICTION_CACHE_SIZE', '10000'))
+    PREDICTION_CACHE_TTL = int(os.getenv('PREDICTION_CACHE_TTL', '3600'))  # seconds, 0 = no expiry
+    
+    # Micro-batching of concurrent single-log predictions
+    MICRO_BATCH_ENABLED = os.getenv('MICRO_BATCH_ENABLED', 'False') == 'True'
+    MICRO_BATCH_SIZE = int(os.getenv('MICRO_BATCH_SIZE', '32'))
+    MICRO_BATCH_MAX_WAIT_MS = float(os.getenv('MICRO_BATCH_MAX_WAIT_MS', '5'))
+    
+    # Multi-process inference for large uploads (0 workers disables)
+    INFERENCE_WORKERS = int(os.getenv('INFERENCE_WORKERS', '0'))
+    INFERENCE_WORKER_THREADS = int(os.getenv('INFERENCE_WORKER_THREADS', '0'))  # 0 = cores / workers
+    # Lines per analyzed chunk (before dedup) that use the pool; keep <= ANALYZE_CHUNK_SIZE
+    PROCESS_POOL_MIN_LOGS = int(os.getenv('PROCESS_POOL_MIN_LOGS', '500'))
+    
+    # Log template mining (classify once per template)
+    TEMPLATE_MINING = os.getenv('TEMPLATE_MINING', 'False') == 'True'
+    TEMPLATE_TREE_DEPTH = int(os.getenv('TEMPLATE_TREE_DEPTH', '4'))
+    TEMPLATE_SIM_THRESHOLD = float(os.getenv('TEMPLATE_SIM_THRESHOLD', '0.4'))
+    TEMPLATE_MAX_CLUSTERS = int(os.getenv('TEMPLATE_MAX_CLUSTERS', '50000'))
+    
+    # Keyword sets (comma-separated) for heuristics and preprocessing
+    MALICIOUS_KEYWORDS = os.getenv(
+        'MALICIOUS_KEYWORDS',
+        'delete,admin,root,sudo,export,database,privilege,escalation,unauthorized,brute'
+    ).split(',')
+    SUSPICIOUS_KEYWORDS = os.getenv(
+        'SUSPICIOUS_KEYWORDS',
+        'failed,denied,attempt,retry,error,forbidden,multiple'
+    ).split(',')
+    BEHAVIOR_KEYWORDS = os.getenv(
+        'BEHAVIOR_KEYWORDS',
+        'login,logout,admin,user,access,denied,export,delete,modify,create,read,write,'
+        'database,file,system,config,password,sudo,root,privilege,escalation,brute,force,'
+        'attempt,failed,success,unauthorized,forbidden,error'
+    ).split(',')
     
     # Threat Thresholds
     SUSPICIOUS_THRESHOLD = float(os.getenv('SUSPICIOUS_THRESHOLD', '0.5'))
@@ -31,3 +104,15 @@ class Config:
     # Upload
     UPLOAD_FOLDER = os.getenv('UPLOAD_FOLDER', 'uploads')
     MAX_UPLOAD_SIZE = int(os.getenv('MAX_UPLOAD_SIZE', '16777216'))  # 16MB
+    MAX_DECOMPRESSED_SIZE = int(os.getenv('MAX_DECOMPRESSED_SIZE', '268435456'))  # 256MB, zip bomb guard
+    MAX_ARCHIVE_MEMBERS = int(os.getenv('MAX_ARCHIVE_MEMBERS', '100'))
+    KEEP_UPLOADS = os.getenv('KEEP_UPLOADS', 'False') == 'True'  # keep uploaded (decompressed) files so log source spans resolve
+    ANALYZE_CHUNK_SIZE = int(os.getenv('ANALYZE_CHUNK_SIZE', '1000'))  # logs per inference/DB batch
+    ANALYZE_MAX_RESULTS = int(os.getenv('ANALYZE_MAX_RESULTS', '100'))  # results echoed per upload
+    CSV_FAST_MODE = os.getenv('CSV_FAST_MODE', 'False') == 'True'  # columnar pandas CSV reader
+    CSV_CHUNK_ROWS = int(os.getenv('CSV_CHUNK_ROWS', '50000'))
+    # CSV columns kept as record metadata by both CSV readers
+    CSV_METADATA_COLUMNS = [c for c in os.getenv('CSV_METADATA_COLUMNS', 'timestamp,user').split(',') if c]
+    MAX_ALERTS_PER_UPLOAD = int(os.getenv('MAX_ALERTS_PER_UPLOAD', '100'))
+    UPLOAD_DEDUP = os.getenv('UPLOAD_DEDUP', 'True') == 'True'  # classify each distinct sequence once
+    UPLOAD_DEDUP_MAX_SEQUENCES = int(os.getenv('UPLOAD_DEDUP_MAX_SEQUENCES', '100000'))
@@ -73,17 +73,8 @@ def create_sample_logs():
         },
     ]
     
-    count = 0
-    for log in sample_data:
-        log_id = db.save_log(
-            event=log['event'],
-            sequence=log['sequence'],
-            prediction=log['prediction'],
-            score=log['score'],
-            user_email='demo@security.com'
-        )
-        if log_id:
-            count += 1
+    log_ids = db.save_logs_bulk([{**log, 'user_email': 'demo@security.com'} for log in sample_data])
+    count = sum(1 for log_id in log_ids if log_id)
     
     print(f"✓ Created {count} sample logs")
     return count > 0
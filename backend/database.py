@@ -1,8 +1,25 @@
-from pymongo import MongoClient
-from datetime import datetime
+from pymongo import MongoClient, ReplaceOne, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+from bson import ObjectId
+from datetime import datetime, timedelta
+import base64
+import time
 from config import Config
 import bcrypt
 
+def encode_cursor(log):
+    """Opaque page token for the (timestamp, _id) position of a log"""
+    position = f"{log['timestamp'].isoformat()}|{log['_id']}"
+    return base64.urlsafe_b64encode(position.encode('utf-8')).decode('ascii')
+
+def decode_cursor(token):
+    """(timestamp, _id string) from a page token; ValueError if malformed"""
+    try:
+        timestamp, log_id = base64.urlsafe_b64decode(token.encode('ascii')).decode('utf-8').split('|', 1)
+        return datetime.fromisoformat(timestamp), log_id
+    except Exception:
+        raise ValueError('Invalid cursor')
+
 class Database:
     """MongoDB database handler"""
     
@@ -12,10 +29,14 @@ class Database:
             self.db = self.client[Config.MONGO_DB_NAME]
             self.users = self.db['users']
             self.logs = self.db['logs']
+            self.counters = self.db['log_counters']
+            self.rollups = self.db['log_rollups']
+            self.leases = self.db['leases']
             # Test connection
             self.client.server_info()
-            self._create_indexes()
             self.connected = True
+            self._create_indexes()
+            self._ensure_counters()
             print("✅ Database connected successfully")
         except Exception as e:
             print(f"[WARNING] Database connection failed: {e}")
@@ -23,6 +44,9 @@ class Database:
             self.connected = False
             self.users = None
             self.logs = None
+            self.counters = None
+            self.rollups = None
+            self.leases = None
             self.offline_logs = [] # In-memory storage for demo session
     
     def _create_indexes(self):
@@ -30,11 +54,43 @@ class Database:
         try:
             if self.connected:
                 self.users.create_index('email', unique=True)
-                self.logs.create_index('timestamp')
-                self.logs.create_index('prediction')
+                # Listings page newest first on (timestamp, _id); the trailing
+                # prediction key lets per-user timeline queries be covered.
+                # These also serve plain timestamp and prediction queries.
+                self.logs.create_index([('timestamp', -1), ('_id', -1)])
+                self.logs.create_index([('user_email', 1), ('timestamp', -1), ('_id', -1), ('prediction', 1)])
+                self.logs.create_index([('user_email', 1), ('prediction', 1), ('timestamp', -1), ('_id', -1)])
+                self.logs.create_index([('prediction', 1), ('timestamp', -1), ('_id', -1)])
+                self.rollups.create_index([('granularity', 1), ('user_email', 1), ('bucket', 1)])
+                # Superseded: prediction_1 by the compounds, and the TTL index
+                # on timestamp by batched retention purges, which keeps statistics in step
+                indexes = self.logs.index_information()
+                for legacy in ('prediction_1', 'timestamp_1'):
+                    if legacy in indexes:
+                        self.logs.drop_index(legacy)
         except:
             pass
     
+    def acquire_lease(self, name, seconds, owner):
+        """Hold the named lease for ``seconds``; False while another owner holds it
+        
+        Lets one process among several run a periodic job. The holder
+        renews by acquiring again before the lease runs out.
+        """
+        if not self.connected:
+            return True
+        
+        now = datetime.utcnow()
+        try:
+            self.leases.find_one_and_update(
+                {'_id': name, '$or': [{'expires_at': {'$lte': now}}, {'owner': owner}]},
+                {'$set': {'owner': owner, 'expires_at': now + timedelta(seconds=seconds)}},
+                upsert=True
+            )
+            return True
+        except DuplicateKeyError:
+            return False
+    
     # ==================== USER OPERATIONS ====================
     
     def create_user(self, email, password, role='normal_user', created_by=None, require_password_reset=False):
@@ -105,23 +161,8 @@ class Database:
     
     # ==================== LOG OPERATIONS ====================
     
-    def save_log(self, event, sequence, prediction, score, user_email=None):
-        """Save analyzed log to database"""
-        if not self.connected:
-            # Save to in-memory list for Demo
-            import uuid
-            new_id = str(uuid.uuid4())
-            self.offline_logs.append({
-                '_id': new_id,
-                'event': event,
-                'sequence': sequence,
-                'prediction': prediction,
-                'score': float(score),
-                'timestamp': datetime.utcnow(),
-                'user_email': user_email
-            })
-            return new_id
-
+    def _build_log(self, event, sequence, prediction, score, user_email=None, template_id=None, source=None,
+                   log_id=None):
         log = {
             'event': event,
             'sequence': sequence,
@@ -130,48 +171,245 @@ class Database:
             'timestamp': datetime.utcnow(),
             'user_email': user_email
         }
+        if template_id is not None:
+            log['template_id'] = template_id
+        if source is not None:
+            log['source'] = source
+        if log_id is not None:
+            log['_id'] = log_id
+        return log
+    
+    def save_log(self, event, sequence, prediction, score, user_email=None, template_id=None, source=None):
+        """Save analyzed log to database
+        
+        ``source`` is the {'file', 'offset', 'length'} span of the log in its
+        spooled upload, when known.
+        """
+        log = self._build_log(event, sequence, prediction, score, user_email, template_id, source)
+
+        if not self.connected:
+            # Save to in-memory list for Demo
+            import uuid
+            new_id = str(uuid.uuid4())
+            self.offline_logs.append({'_id': new_id, **log})
+            return new_id
+
         result = self.logs.insert_one(log)
+        self._record_logs([log])
         return str(result.inserted_id)
     
-    def get_all_logs(self, limit=100):
-        """Get all logs with limit"""
-        if not self.connected: 
-            # Return In-Memory Logs + Demo Logs
-            demo_logs = [
-                {'_id': 'demo1', 'event': 'admin login failed multiple times', 'prediction': 'malicious', 'score': 0.98, 'timestamp': datetime.utcnow(), 'user_email': 'system'},
-                {'_id': 'demo2', 'event': 'user login successful', 'prediction': 'normal', 'score': 0.05, 'timestamp': datetime.utcnow(), 'user_email': 'mahesh@test.com'},
-                {'_id': 'demo3', 'event': 'suspicious port scanning detected', 'prediction': 'suspicious', 'score': 0.75, 'timestamp': datetime.utcnow(), 'user_email': 'network_monitor'},
-                {'_id': 'demo4', 'event': 'file upload: report.pdf', 'prediction': 'normal', 'score': 0.02, 'timestamp': datetime.utcnow(), 'user_email': 'hr@company.com'},
-                {'_id': 'demo5', 'event': 'database export initiated by unauthorized user', 'prediction': 'malicious', 'score': 0.95, 'timestamp': datetime.utcnow(), 'user_email': 'unknown'}
+    def save_logs_bulk(self, logs, chunk_size=None):
+        """Save many analyzed logs with one round trip per chunk
+        
+        ``logs`` are dicts of save_log's keyword arguments, optionally with
+        a pre-assigned ``log_id``. Each chunk is an unordered insert_many,
+        so one bad document does not stop the rest. Returns the inserted ids
+        in input order, with None for any log that failed to insert.
+        """
+        documents = [self._build_log(**log) for log in logs]
+        
+        if not self.connected:
+            # Save to in-memory list for Demo
+            import uuid
+            for log in documents:
+                log.setdefault('_id', str(uuid.uuid4()))
+            self.offline_logs.extend(documents)
+            return [log['_id'] for log in documents]
+        
+        chunk_size = chunk_size or Config.DB_BULK_CHUNK_SIZE
+        ids = []
+        for start in range(0, len(documents), chunk_size):
+            chunk = documents[start:start + chunk_size]
+            for log in chunk:
+                log['_id'] = ObjectId(log.get('_id'))
+            chunk_ids = [str(log['_id']) for log in chunk]
+            
+            try:
+                self.logs.insert_many(chunk, ordered=False)
+            except BulkWriteError as e:
+                failed = e.details.get('writeErrors', [])
+                print(f"[WARNING] {len(failed)} of {len(chunk)} logs failed to save: {failed[0]['errmsg']}")
+                for error in failed:
+                    chunk_ids[error['index']] = None
+            self._record_logs([log for log, log_id in zip(chunk, chunk_ids) if log_id])
+            ids.extend(chunk_ids)
+        
+        return ids
+    
+    def _demo_logs(self):
+        return [
+            {'_id': 'demo1', 'event': 'admin login failed multiple times', 'prediction': 'malicious', 'score': 0.98, 'timestamp': datetime.utcnow(), 'user_email': 'system'},
+            {'_id': 'demo2', 'event': 'user login successful', 'prediction': 'normal', 'score': 0.05, 'timestamp': datetime.utcnow(), 'user_email': 'mahesh@test.com'},
+            {'_id': 'demo3', 'event': 'suspicious port scanning detected', 'prediction': 'suspicious', 'score': 0.75, 'timestamp': datetime.utcnow(), 'user_email': 'network_monitor'},
+            {'_id': 'demo4', 'event': 'file upload: report.pdf', 'prediction': 'normal', 'score': 0.02, 'timestamp': datetime.utcnow(), 'user_email': 'hr@company.com'},
+            {'_id': 'demo5', 'event': 'database export initiated by unauthorized user', 'prediction': 'malicious', 'score': 0.95, 'timestamp': datetime.utcnow(), 'user_email': 'unknown'}
+        ]
+    
+    def find_logs(self, user_email=None, prediction=None, limit=100, projection=None, after=None):
+        """Cursor over logs, newest first, optionally for one user and/or prediction
+        
+        Logs are ordered by (timestamp, _id) descending; ``after`` is the
+        (timestamp, _id) of the last log of the previous page. Every
+        combination is served by an index on the filter fields followed by
+        timestamp and _id, so deep pages cost the same as the first. A
+        projection of only indexed fields with ``'_id': 0`` (e.g. timestamp
+        and prediction for one user) is answered from the index alone.
+        """
+        query = {}
+        if user_email is not None:
+            query['user_email'] = user_email
+        if prediction is not None:
+            query['prediction'] = prediction
+        if after is not None:
+            timestamp, last_id = after
+            query['$or'] = [
+                {'timestamp': {'$lt': timestamp}},
+                {'timestamp': timestamp, '_id': {'$lt': last_id}}
             ]
-            # Combine newly analyzed logs with demo logs (newest first)
-            all_demo = sorted(self.offline_logs + demo_logs, key=lambda x: x['timestamp'], reverse=True)
-            return all_demo[:limit]
+        return self.logs.find(query, projection).sort([('timestamp', -1), ('_id', -1)]).limit(limit)
+    
+    def get_logs_page(self, user_email=None, prediction=None, limit=100, cursor=None, fields=None):
+        """One page of logs and the cursor token for the next page
         
-        logs = list(self.logs.find().sort('timestamp', -1).limit(limit))
+        ``cursor`` is a token from a previous page (None for the first);
+        ``fields`` limits the returned fields (_id and timestamp are always
+        included). The next cursor is None on the last page. Raises
+        ValueError for a malformed cursor.
+        """
+        after = decode_cursor(cursor) if cursor else None
+        projection = dict.fromkeys(['timestamp', *fields], 1) if fields else None
+        
+        if not self.connected:
+            logs = self._offline_logs(user_email, prediction, limit + 1, projection, after,
+                                      demo=user_email is None and prediction is None)
+        else:
+            if after is not None:
+                if not ObjectId.is_valid(after[1]):
+                    raise ValueError('Invalid cursor')
+                after = (after[0], ObjectId(after[1]))
+            logs = self._list_logs(self.find_logs(user_email, prediction, limit + 1, projection, after))
+        
+        next_cursor = encode_cursor(logs[limit - 1]) if len(logs) > limit else None
+        return logs[:limit], next_cursor
+    
+    def _list_logs(self, cursor):
+        logs = list(cursor)
         for log in logs:
-            log['_id'] = str(log['_id'])
+            if '_id' in log:
+                log['_id'] = str(log['_id'])
         return logs
     
-    def get_logs_by_prediction(self, prediction, limit=100):
-        """Get logs filtered by prediction type"""
-        logs = list(self.logs.find({'prediction': prediction}).sort('timestamp', -1).limit(limit))
+    def _offline_logs(self, user_email=None, prediction=None, limit=100, projection=None, after=None,
+                      demo=False):
+        logs = [
+            log for log in self.offline_logs + (self._demo_logs() if demo else [])
+            if (user_email is None or log.get('user_email') == user_email)
+            and (prediction is None or log['prediction'] == prediction)
+            and (after is None or (log['timestamp'], log['_id']) < after)
+        ]
+        logs = sorted(logs, key=lambda x: (x['timestamp'], x['_id']), reverse=True)[:limit]
+        if not projection:
+            return logs
+        
+        # Same inclusion/exclusion semantics as a Mongo projection
+        included = {field for field, include in projection.items() if include and field != '_id'}
+        if included:
+            if projection.get('_id', 1):
+                included.add('_id')
+            return [{k: v for k, v in log.items() if k in included} for log in logs]
+        return [{k: v for k, v in log.items() if projection.get(k, 1)} for log in logs]
+    
+    def _record_logs(self, logs, sign=1):
+        """Keep counters and rollups in step with saved (or deleted) logs"""
+        self._update_counters(logs, sign)
+        self._update_rollups(logs, sign)
+    
+    # ==================== STATISTICS COUNTERS ====================
+    
+    # One counters document for all logs and one per user, e.g.
+    # {'_id': 'user:jane@corp.com', 'total': 12, 'normal': 10, 'malicious': 2}
+    #
+    # Counters and rollups always describe the stored logs: every deletion
+    # (delete_log, purge_logs and so retention, clear_all_logs) takes its logs
+    # out of them, so rebuild_counters and backfill_rollups, which recount
+    # stored logs, agree with them at any time.
+    GLOBAL_COUNTER = 'global'
+    
+    @staticmethod
+    def _counter_id(user_email=None):
+        return f'user:{user_email}' if user_email else Database.GLOBAL_COUNTER
+    
+    def _update_counters(self, logs, sign=1):
+        """$inc the global and per-user counters for saved (or deleted) logs"""
+        if not logs:
+            return
+        
+        deltas = {}
         for log in logs:
-            log['_id'] = str(log['_id'])
-        return logs
+            keys = [self.GLOBAL_COUNTER]
+            if log.get('user_email'):
+                keys.append(self._counter_id(log['user_email']))
+            for key in keys:
+                delta = deltas.setdefault(key, {'total': 0})
+                delta['total'] += sign
+                delta[log['prediction']] = delta.get(log['prediction'], 0) + sign
+        
+        try:
+            self.counters.bulk_write(
+                [UpdateOne({'_id': key}, {'$inc': delta}, upsert=True) for key, delta in deltas.items()],
+                ordered=False
+            )
+        except Exception as e:
+            print(f"[WARNING] Failed to update log counters (run rebuild_counters): {e}")
+    
+    def _ensure_counters(self):
+        """Build the counters from existing logs if they have never been built"""
+        if self.counters.find_one({'_id': self.GLOBAL_COUNTER}, {'_id': 1}) is None:
+            print("Building log statistics counters...")
+            self.rebuild_counters()
     
-    def get_malicious_logs(self, limit=50):
-        """Get only malicious logs"""
-        return self.get_logs_by_prediction('malicious', limit)
+    def rebuild_counters(self):
+        """Recompute every counter from the logs with one $group aggregation
+        
+        Fixes counters that drifted (e.g. logs written or removed outside
+        this class). Returns the number of counter documents written.
+        """
+        counters = {self.GLOBAL_COUNTER: {'total': 0}}
+        pipeline = [{'$group': {
+            '_id': {'user_email': '$user_email', 'prediction': '$prediction'},
+            'count': {'$sum': 1}
+        }}]
+        for group in self.logs.aggregate(pipeline, allowDiskUse=True):
+            keys = [self.GLOBAL_COUNTER]
+            if group['_id'].get('user_email'):
+                keys.append(self._counter_id(group['_id']['user_email']))
+            for key in keys:
+                counter = counters.setdefault(key, {'total': 0})
+                counter['total'] += group['count']
+                prediction = group['_id'].get('prediction')
+                counter[prediction] = counter.get(prediction, 0) + group['count']
+        
+        self.counters.bulk_write(
+            [ReplaceOne({'_id': key}, counter, upsert=True) for key, counter in counters.items()],
+            ordered=False
+        )
+        self.counters.delete_many({'_id': {'$nin': list(counters)}})
+        return len(counters)
     
-    def get_statistics(self):
-        """Get overall statistics"""
+    def get_statistics(self, user_email=None):
+        """Get overall statistics, or one user's with ``user_email``
+        
+        Reads a single counters document.
+        """
         if not self.connected:
             # Calculate stats dynamically from offline logs
-            all_logs = self.offline_logs + [
-                {'prediction': 'malicious'}, {'prediction': 'normal'}, {'prediction': 'suspicious'}, 
-                {'prediction': 'normal'}, {'prediction': 'malicious'}
-            ] # include base demo counts
+            if user_email:
+                all_logs = [log for log in self.offline_logs if log.get('user_email') == user_email]
+            else:
+                all_logs = self.offline_logs + [
+                    {'prediction': 'malicious'}, {'prediction': 'normal'}, {'prediction': 'suspicious'}, 
+                    {'prediction': 'normal'}, {'prediction': 'malicious'}
+                ] # include base demo counts
             
             total = len(all_logs)
             normal = sum(1 for log in all_logs if log['prediction'] == 'normal')
@@ -179,29 +417,249 @@ class Database:
             malicious = sum(1 for log in all_logs if log['prediction'] == 'malicious')
             
             return {'total': total, 'normal': normal, 'suspicious': suspicious, 'malicious': malicious}
-            
-        total = self.logs.count_documents({})
-        normal = self.logs.count_documents({'prediction': 'normal'})
-        suspicious = self.logs.count_documents({'prediction': 'suspicious'})
-        malicious = self.logs.count_documents({'prediction': 'malicious'})
+        
+        counter = self.counters.find_one({'_id': self._counter_id(user_email)}) or {}
         
         return {
-            'total': total,
-            'normal': normal,
-            'suspicious': suspicious,
-            'malicious': malicious
+            'total': counter.get('total', 0),
+            'normal': counter.get('normal', 0),
+            'suspicious': counter.get('suspicious', 0),
+            'malicious': counter.get('malicious', 0)
         }
     
+    # ==================== TIME SERIES ROLLUPS ====================
+    
+    # Per-minute and per-hour counts by prediction, one document per bucket
+    # for all logs (user_email None) and one per user, e.g.
+    # {'_id': 'hour|jane@corp.com|2024-05-01T13:00', 'granularity': 'hour',
+    #  'user_email': 'jane@corp.com', 'bucket': datetime(2024, 5, 1, 13),
+    #  'total': 7, 'normal': 6, 'malicious': 1}
+    ROLLUP_GRANULARITIES = {'minute': '%Y-%m-%dT%H:%M', 'hour': '%Y-%m-%dT%H:00'}
+    
+    @staticmethod
+    def _bucket_start(timestamp, granularity):
+        if granularity == 'hour':
+            return timestamp.replace(minute=0, second=0, microsecond=0)
+        return timestamp.replace(second=0, microsecond=0)
+    
+    @staticmethod
+    def _rollup_id(granularity, bucket, user_email=None):
+        return f"{granularity}|{user_email or '*'}|{bucket.strftime(Database.ROLLUP_GRANULARITIES[granularity])}"
+    
+    def _rollup_deltas(self, groups):
+        """Rollup documents' counts from (timestamp, user_email, prediction, count) groups"""
+        rollups = {}
+        for timestamp, user_email, prediction, count in groups:
+            for granularity in self.ROLLUP_GRANULARITIES:
+                bucket = self._bucket_start(timestamp, granularity)
+                for user in ([None, user_email] if user_email else [None]):
+                    key = self._rollup_id(granularity, bucket, user)
+                    rollup = rollups.setdefault(key, {
+                        'fields': {'granularity': granularity, 'user_email': user, 'bucket': bucket},
+                        'counts': {'total': 0}
+                    })
+                    rollup['counts']['total'] += count
+                    rollup['counts'][prediction] = rollup['counts'].get(prediction, 0) + count
+        return rollups
+    
+    def _update_rollups(self, logs, sign=1):
+        """$inc the minute and hour rollups for saved (or deleted) logs"""
+        if not logs:
+            return
+        
+        rollups = self._rollup_deltas(
+            (log['timestamp'], log.get('user_email'), log['prediction'], sign) for log in logs
+        )
+        try:
+            self.rollups.bulk_write(
+                [UpdateOne({'_id': key}, {'$setOnInsert': rollup['fields'], '$inc': rollup['counts']}, upsert=True)
+                 for key, rollup in rollups.items()],
+                ordered=False
+            )
+        except Exception as e:
+            print(f"[WARNING] Failed to update log rollups (run backfill_rollups): {e}")
+    
+    def backfill_rollups(self, start=None, end=None):
+        """Rebuild the rollups for logs in [start, end) from the logs collection
+        
+        Groups logs per minute, user and prediction with one aggregation and
+        replaces the minute and hour rollups covering the range, so it also
+        repairs drift. Bounds are rounded out to whole hours. Returns the
+        number of rollup documents written.
+        """
+        match = {}
+        if start is not None:
+            start = self._bucket_start(start, 'hour')
+            match.setdefault('timestamp', {})['$gte'] = start
+        if end is not None:
+            rounded = self._bucket_start(end, 'hour')
+            end = rounded if rounded == end else rounded + timedelta(hours=1)
+            match.setdefault('timestamp', {})['$lt'] = end
+        
+        pipeline = [
+            {'$match': match},
+            {'$group': {
+                '_id': {
+                    'minute': {'$dateToString': {'format': '%Y-%m-%dT%H:%M', 'date': '$timestamp'}},
+                    'user_email': '$user_email',
+                    'prediction': '$prediction'
+                },
+                'count': {'$sum': 1}
+            }}
+        ]
+        groups = (
+            (datetime.strptime(group['_id']['minute'], '%Y-%m-%dT%H:%M'),
+             group['_id'].get('user_email'), group['_id'].get('prediction'), group['count'])
+            for group in self.logs.aggregate(pipeline, allowDiskUse=True)
+        )
+        rollups = self._rollup_deltas(groups)
+        
+        # Replace every rollup in the range, dropping buckets that no longer have logs
+        stale = {}
+        if start is not None:
+            stale.setdefault('bucket', {})['$gte'] = start
+        if end is not None:
+            stale.setdefault('bucket', {})['$lt'] = end
+        self.rollups.delete_many(stale)
+        
+        documents = [{'_id': key, **rollup['fields'], **rollup['counts']} for key, rollup in rollups.items()]
+        for offset in range(0, len(documents), Config.DB_BULK_CHUNK_SIZE):
+            self.rollups.insert_many(documents[offset:offset + Config.DB_BULK_CHUNK_SIZE], ordered=False)
+        return len(documents)
+    
+    def get_timeseries(self, start, end, granularity='hour', user_email=None):
+        """Counts by prediction per bucket in [start, end), oldest first
+        
+        ``granularity`` is 'minute', 'hour' or 'day' (summed from hourly
+        rollups). Only rollup documents are read; every bucket in the range
+        is returned, with zero counts where there were no logs.
+        """
+        source = 'minute' if granularity == 'minute' else 'hour'
+        
+        def bucket_of(timestamp):
+            if granularity == 'day':
+                return timestamp.replace(hour=0, minute=0, second=0, microsecond=0)
+            return self._bucket_start(timestamp, source)
+        
+        # The first bucket is counted whole, even when start falls inside it
+        first = bucket_of(start)
+        
+        if not self.connected:
+            # Count offline logs directly
+            rows = [
+                {'bucket': log['timestamp'], 'total': 1, log['prediction']: 1}
+                for log in self.offline_logs
+                if (user_email is None or log.get('user_email') == user_email)
+                and first <= log['timestamp'] < end
+            ]
+        else:
+            rows = self.rollups.find(
+                {'granularity': source, 'user_email': user_email, 'bucket': {'$gte': first, '$lt': end}},
+                {'_id': 0, 'granularity': 0, 'user_email': 0}
+            )
+        
+        step = {'minute': timedelta(minutes=1), 'hour': timedelta(hours=1), 'day': timedelta(days=1)}[granularity]
+        series = {}
+        bucket = first
+        while bucket < end:
+            series[bucket] = {'bucket': bucket, 'total': 0, 'normal': 0, 'suspicious': 0, 'malicious': 0}
+            bucket += step
+        
+        for row in rows:
+            point = series.get(bucket_of(row.pop('bucket')))
+            if point is not None:
+                for prediction, count in row.items():
+                    point[prediction] = point.get(prediction, 0) + count
+        return list(series.values())
+    
     def delete_log(self, log_id):
         """Delete a log by ID"""
         from bson.objectid import ObjectId
-        result = self.logs.delete_one({'_id': ObjectId(log_id)})
-        return result.deleted_count > 0
+        log = self.logs.find_one_and_delete(
+            {'_id': ObjectId(log_id)},
+            projection={'prediction': 1, 'user_email': 1, 'timestamp': 1}
+        )
+        if log is None:
+            return False
+        self._record_logs([log], sign=-1)
+        return True
     
     def clear_all_logs(self):
-        """Clear all logs (admin only)"""
-        result = self.logs.delete_many({})
-        return result.deleted_count
+        """Clear all logs (admin only)
+        
+        Drops and recreates the logs collection and its indexes, which is
+        near-instant regardless of size, and resets counters and rollups.
+        Returns the (estimated) number of logs removed.
+        """
+        if not self.connected:
+            count = len(self.offline_logs)
+            self.offline_logs.clear()
+            return count
+        
+        count = self.logs.estimated_document_count()
+        self.logs.drop()
+        self.counters.delete_many({})
+        self.rollups.delete_many({})
+        self._create_indexes()
+        self.rebuild_counters()
+        return count
+    
+    def purge_logs(self, before=None, batch_size=None, pause_ms=None, progress=None):
+        """Delete logs older than ``before`` (all logs if None) in small batches
+        
+        Walks the matching logs oldest first on the (timestamp, _id) index
+        and deletes each batch by id, sleeping ``pause_ms`` between batches
+        so the purge does not monopolize the collection. Each batch is
+        taken out of the counters and rollups as it is deleted.
+        ``progress`` (a dict, if given) is updated in place with 'deleted',
+        'batches' and 'estimated_total'. Returns the number of logs deleted.
+        """
+        batch_size = batch_size or Config.PURGE_BATCH_SIZE
+        pause = (Config.PURGE_PAUSE_MS if pause_ms is None else pause_ms) / 1000
+        progress = progress if progress is not None else {}
+        query = {'timestamp': {'$lt': before}} if before is not None else {}
+        
+        if not self.connected:
+            remaining = [log for log in self.offline_logs if before is not None and log['timestamp'] >= before]
+            deleted = len(self.offline_logs) - len(remaining)
+            self.offline_logs[:] = remaining
+            progress.update(deleted=deleted, batches=1, estimated_total=deleted)
+            return deleted
+        
+        progress.update(
+            deleted=0,
+            batches=0,
+            estimated_total=self.logs.count_documents(query) if query else self.logs.estimated_document_count()
+        )
+        
+        last = None
+        while True:
+            batch_query = dict(query)
+            if last is not None:
+                batch_query['$or'] = [
+                    {'timestamp': {'$gt': last['timestamp']}},
+                    {'timestamp': last['timestamp'], '_id': {'$gt': last['_id']}}
+                ]
+            batch = list(
+                self.logs.find(batch_query, {'prediction': 1, 'user_email': 1, 'timestamp': 1})
+                .sort([('timestamp', 1), ('_id', 1)]).limit(batch_size)
+            )
+            if not batch:
+                break
+            
+            last = batch[-1]
+            result = self.logs.delete_many({'_id': {'$in': [log['_id'] for log in batch]}})
+            self._record_logs(batch, sign=-1)
+            if result.deleted_count != len(batch):
+                print(f"[WARNING] {len(batch) - result.deleted_count} logs in a purge batch were already "
+                      "deleted elsewhere (run rebuild_counters and backfill_rollups)")
+            
+            progress['deleted'] += result.deleted_count
+            progress['batches'] += 1
+            if pause:
+                time.sleep(pause)
+        
+        return progress['deleted']
 
 # Initialize database instance
 db = Database()
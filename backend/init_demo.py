@@ -82,20 +82,23 @@ def create_demo_logs():
     try:
         detector = get_detector()
         
+        logs = []
         for event in demo_events:
             sequence = preprocessor.extract_sequence(event)
             result = detector.predict(sequence)
             
-            log_id = db.save_log(
-                event=event,
-                sequence=sequence,
-                prediction=result['prediction'],
-                score=result['score'],
-                user_email='system'
-            )
+            logs.append({
+                'event': event,
+                'sequence': sequence,
+                'prediction': result['prediction'],
+                'score': result['score'],
+                'user_email': 'system'
+            })
             
             print(f"✓ Created log: {event[:50]}... [{result['prediction']}]")
         
+        db.save_logs_bulk(logs)
+        
         print("=" * 60)
         print(f"✓ Created {len(demo_events)} demo logs")
         
@@ -0,0 +1,106 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from config import Config
+
+
+def _pow2_bucket(n):
+    """Histogram label for n: '0', '1', '2-3', '4-7', ..."""
+    if n <= 1:
+        return str(n)
+    low = 1 << (n.bit_length() - 1)
+    return f"{low}-{2 * low - 1}"
+
+
+class MicroBatcher:
+    """Coalesces concurrent single predictions into batched forward passes
+
+    Callers block in ``submit`` while a background thread collects queued
+    texts and flushes them through ``predict_batch`` as soon as either
+    ``max_batch_size`` texts are waiting or ``max_wait_ms`` has passed
+    since the first one arrived.
+    """
+
+    def __init__(self, predict_batch, max_batch_size=Config.MICRO_BATCH_SIZE,
+                 max_wait_ms=Config.MICRO_BATCH_MAX_WAIT_MS):
+        self.predict_batch = predict_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._queue = queue.Queue()
+
+        # Metrics
+        self._stats_lock = threading.Lock()
+        self.batches = 0
+        self.requests = 0
+        self.flush_reasons = {'size': 0, 'deadline': 0}
+        self.batch_size_histogram = {}
+        self.queue_depth_histogram = {}
+        self.max_queue_depth = 0
+
+        self._thread = threading.Thread(target=self._run, name='micro-batcher', daemon=True)
+        self._thread.start()
+
+    def submit(self, text, timeout=None):
+        """Queue one text and wait for its prediction"""
+        future = Future()
+        self._queue.put((text, future))
+        return future.result(timeout)
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.max_wait
+
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            self._record_flush(len(batch), self._queue.qsize())
+            self._flush(batch)
+
+    def _flush(self, batch):
+        try:
+            results = self.predict_batch([text for text, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+
+        for (_, future), result in zip(batch, results):
+            future.set_result(result)
+
+    def _record_flush(self, batch_size, depth):
+        with self._stats_lock:
+            self.batches += 1
+            self.requests += batch_size
+            self.flush_reasons['size' if batch_size >= self.max_batch_size else 'deadline'] += 1
+
+            size_bucket = _pow2_bucket(batch_size)
+            self.batch_size_histogram[size_bucket] = self.batch_size_histogram.get(size_bucket, 0) + 1
+
+            # Depth of the queue left behind when this batch was taken
+            depth_bucket = _pow2_bucket(depth)
+            self.queue_depth_histogram[depth_bucket] = self.queue_depth_histogram.get(depth_bucket, 0) + 1
+            self.max_queue_depth = max(self.max_queue_depth, depth + batch_size)
+
+    def get_stats(self):
+        """Queue depth and batch-size metrics"""
+        with self._stats_lock:
+            return {
+                'max_batch_size': self.max_batch_size,
+                'max_wait_ms': self.max_wait * 1000,
+                'queue_depth': self._queue.qsize(),
+                'max_queue_depth': self.max_queue_depth,
+                'batches': self.batches,
+                'requests': self.requests,
+                'mean_batch_size': self.requests / self.batches if self.batches else 0.0,
+                'flush_reasons': dict(self.flush_reasons),
+                'batch_size_histogram': dict(self.batch_size_histogram),
+                'queue_depth_histogram': dict(self.queue_depth_histogram)
+            }
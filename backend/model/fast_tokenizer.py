@@ -0,0 +1,97 @@
+import re
+import threading
+
+import numpy as np
+from config import Config
+
+# extract_sequence only emits lowercase alphanumeric words separated by single spaces
+_SIMPLE_TEXT = re.compile(r'^[a-z0-9 ]*$')
+
+
+def pad_sequences(sequences, width, pad_id):
+    """Assemble padded input_ids/attention_mask arrays from lists of token ids"""
+    lengths = np.fromiter((len(ids) for ids in sequences), dtype=np.int64, count=len(sequences))
+    attention_mask = (np.arange(width) < lengths[:, None]).astype(np.int64)
+    input_ids = np.full((len(sequences), width), pad_id, dtype=np.int64)
+    if lengths.sum():
+        input_ids[attention_mask.astype(bool)] = np.concatenate(
+            [np.asarray(ids, dtype=np.int64) for ids in sequences if ids]
+        )
+    return input_ids, attention_mask
+
+
+class FastEncoder:
+    """Memoized WordPiece encoder for behavior sequences
+
+    Behavior sequences are whitespace-separated lowercase alphanumeric
+    words, and WordPiece never merges across whitespace, so a sequence's
+    ids are [CLS] + the ids of each word + [SEP]. Each word is tokenized
+    once with the real tokenizer and its ids memoized. Texts containing
+    anything else go through the real tokenizer unchanged.
+    """
+
+    def __init__(self, tokenizer, max_length=Config.MAX_SEQ_LENGTH,
+                 max_words=Config.FAST_TOKENIZER_MAX_WORDS):
+        self.tokenizer = tokenizer
+        self.max_length = max_length
+        self.max_words = max_words
+        self.cls_id = tokenizer.cls_token_id
+        self.sep_id = tokenizer.sep_token_id
+        self.pad_id = tokenizer.pad_token_id
+        self._word_ids = {}
+        self._lock = threading.Lock()
+
+        # Counters
+        self.word_hits = 0
+        self.word_misses = 0
+        self.fallbacks = 0
+
+    def _ids_for_word(self, word):
+        ids = self._word_ids.get(word)
+        if ids is not None:
+            self.word_hits += 1
+            return ids
+
+        self.word_misses += 1
+        ids = self.tokenizer(word, add_special_tokens=False)['input_ids']
+        if len(self._word_ids) < self.max_words:
+            with self._lock:
+                self._word_ids[word] = ids
+        return ids
+
+    def encode(self, text):
+        """Token ids for text with [CLS]/[SEP], truncated to max_length"""
+        if not _SIMPLE_TEXT.match(text):
+            self.fallbacks += 1
+            return self.tokenizer(text, max_length=self.max_length, truncation=True)['input_ids']
+
+        budget = self.max_length - 2
+        ids = [self.cls_id]
+        for word in text.split():
+            ids.extend(self._ids_for_word(word))
+            if len(ids) > budget:
+                break
+        del ids[budget + 1:]
+        ids.append(self.sep_id)
+        return ids
+
+    def encode_batch(self, texts, width=None):
+        """Padded (input_ids, attention_mask) NumPy arrays for texts
+
+        Pads to ``width`` or, if not given, to the longest text.
+        """
+        sequences = [self.encode(text) for text in texts]
+        width = width or max(len(ids) for ids in sequences)
+        return pad_sequences(sequences, width, self.pad_id)
+
+    def get_stats(self):
+        """Word memo size and hit/miss/fallback counters"""
+        lookups = self.word_hits + self.word_misses
+        return {
+            'words': len(self._word_ids),
+            'max_words': self.max_words,
+            'word_hits': self.word_hits,
+            'word_misses': self.word_misses,
+            'fallbacks': self.fallbacks,
+            'hit_rate': self.word_hits / lookups if lookups else 0.0
+        }
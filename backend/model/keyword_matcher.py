@@ -0,0 +1,113 @@
+"""
+Single-pass multi-pattern keyword matching.
+
+Builds one Aho-Corasick automaton over every configured keyword set and
+counts, per set, how many distinct keywords occur anywhere in a text in a
+single scan. Equivalent to ``sum(1 for kw in keywords if kw in text)`` per
+set, but the cost no longer grows with the number of keywords.
+
+Run ``python -m model.keyword_matcher`` (from the backend directory) for a
+microbenchmark against the per-keyword scan as the lists grow.
+"""
+
+import ahocorasick
+from config import Config
+
+
+class KeywordMatcher:
+    """Aho-Corasick matcher over named keyword sets"""
+
+    def __init__(self, keyword_sets):
+        self.categories = list(keyword_sets)
+        self._automaton = ahocorasick.Automaton()
+
+        # Each keyword maps to every category it belongs to
+        owners = {}
+        for category, keywords in keyword_sets.items():
+            for keyword in keywords:
+                owners.setdefault(keyword, []).append(category)
+        for keyword, categories in owners.items():
+            self._automaton.add_word(keyword, (keyword, tuple(categories)))
+
+        self.size = len(owners)
+        if self.size:
+            self._automaton.make_automaton()
+
+    def matches(self, text):
+        """Distinct keywords found in text, with their categories"""
+        if not self.size:
+            return {}
+        return dict(value for _, value in self._automaton.iter(text))
+
+    def count(self, text):
+        """Number of distinct keywords per category found in text"""
+        counts = dict.fromkeys(self.categories, 0)
+        for categories in self.matches(text).values():
+            for category in categories:
+                counts[category] += 1
+        return counts
+
+    def count_batch(self, texts):
+        """``count`` over many texts"""
+        return [self.count(text) for text in texts]
+
+
+def threat_keyword_matcher():
+    """Matcher over the configured malicious/suspicious heuristic keywords"""
+    return KeywordMatcher({
+        'malicious': Config.MALICIOUS_KEYWORDS,
+        'suspicious': Config.SUSPICIOUS_KEYWORDS
+    })
+
+
+def _benchmark():
+    import csv
+    import glob
+    import random
+    import string
+    import time
+
+    from model.preprocessor import preprocessor
+
+    random.seed(0)
+    texts = []
+    for path in sorted(glob.glob('../**/*.csv', recursive=True)):
+        with open(path, newline='', encoding='utf-8') as f:
+            texts.extend(preprocessor.clean_text(' '.join(row)) for row in csv.reader(f))
+    texts = texts * max(1, 20000 // len(texts))
+
+    def random_words(n):
+        return [''.join(random.choices(string.ascii_lowercase, k=random.randint(4, 10)))
+                for _ in range(n)]
+
+    print("=" * 60)
+    print(f"Keyword matching over {len(texts)} lines")
+    print(f"{'keywords':>10} {'per-keyword scan':>20} {'automaton':>16} {'speedup':>9}")
+
+    base = Config.MALICIOUS_KEYWORDS + Config.SUSPICIOUS_KEYWORDS
+    for size in (len(base), 100, 250, 500, 1000):
+        extra = random_words(max(0, size - len(base)))
+        malicious = Config.MALICIOUS_KEYWORDS + extra[:len(extra) // 2]
+        suspicious = Config.SUSPICIOUS_KEYWORDS + extra[len(extra) // 2:]
+        matcher = KeywordMatcher({'malicious': malicious, 'suspicious': suspicious})
+
+        start = time.perf_counter()
+        expected = [
+            {'malicious': sum(1 for kw in set(malicious) if kw in text),
+             'suspicious': sum(1 for kw in set(suspicious) if kw in text)}
+            for text in texts
+        ]
+        naive = time.perf_counter() - start
+
+        start = time.perf_counter()
+        actual = matcher.count_batch(texts)
+        compiled = time.perf_counter() - start
+
+        assert actual == expected
+        print(f"{matcher.size:>10} {len(texts) / naive:>14,.0f} l/s {len(texts) / compiled:>12,.0f} l/s "
+              f"{naive / compiled:>8.1f}x")
+    print("=" * 60)
+
+
+if __name__ == '__main__':
+    _benchmark()
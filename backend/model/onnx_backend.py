@@ -0,0 +1,186 @@
+"""
+ONNX Runtime backend for the threat detection model.
+
+Exports ThreatDetectionModel (DistilBERT backbone plus classification head)
+to ONNX, checks the exported graph against PyTorch and benchmarks both.
+
+Exports the fine-tuned weights at MODEL_PATH (train_model.py) and refuses
+to export an untrained classification head.
+
+Usage (from the backend directory):
+    python -m model.onnx_backend [--weights model/threat_detection_model.pth]
+
+Then set INFERENCE_BACKEND=onnx to serve predictions through onnxruntime.
+"""
+
+import argparse
+import glob
+import os
+import time
+
+import numpy as np
+import torch
+from config import BASE_DIR, Config
+
+
+def export_onnx(model, tokenizer, output_path=Config.ONNX_MODEL_PATH, opset=14):
+    """Export a ThreatDetectionModel to ONNX with dynamic batch and sequence axes"""
+    model.eval()
+    sample = tokenizer(
+        ['login user dashboard', 'admin export database delete'],
+        padding=True,
+        return_tensors='pt'
+    )
+
+    os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+    with torch.no_grad():
+        torch.onnx.export(
+            model.cpu(),
+            (sample['input_ids'], sample['attention_mask']),
+            output_path,
+            input_names=['input_ids', 'attention_mask'],
+            output_names=['logits'],
+            dynamic_axes={
+                'input_ids': {0: 'batch', 1: 'sequence'},
+                'attention_mask': {0: 'batch', 1: 'sequence'},
+                'logits': {0: 'batch'}
+            },
+            opset_version=opset,
+            do_constant_folding=True
+        )
+
+    return output_path
+
+
+def create_session(model_path=Config.ONNX_MODEL_PATH, num_threads=Config.ONNX_NUM_THREADS):
+    """Create a CPU onnxruntime session with all graph optimizations enabled"""
+    import onnxruntime as ort
+
+    options = ort.SessionOptions()
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    if num_threads:
+        options.intra_op_num_threads = num_threads
+
+    return ort.InferenceSession(model_path, options, providers=['CPUExecutionProvider'])
+
+
+def check_parity(detector, session, texts, atol=1e-4):
+    """Compare PyTorch and onnxruntime logits on the same inputs
+
+    Returns the largest absolute logit difference and whether every
+    predicted class matches.
+    """
+    inputs = detector.tokenizer(
+        texts,
+        max_length=detector.max_length,
+        padding=True,
+        truncation=True,
+        return_tensors='pt'
+    )
+
+    with torch.no_grad():
+        torch_logits = detector.model(inputs['input_ids'], inputs['attention_mask']).numpy()
+    onnx_logits = session.run(['logits'], {
+        'input_ids': inputs['input_ids'].numpy(),
+        'attention_mask': inputs['attention_mask'].numpy()
+    })[0]
+
+    max_diff = float(np.abs(torch_logits - onnx_logits).max())
+    same_classes = bool((torch_logits.argmax(axis=1) == onnx_logits.argmax(axis=1)).all())
+
+    return {
+        'max_abs_diff': max_diff,
+        'same_classes': same_classes,
+        'passed': same_classes and max_diff <= atol
+    }
+
+
+def benchmark(run_batch, texts, batch_size, runs=5):
+    """Time ``run_batch`` over ``texts`` and report latency and throughput"""
+    batches = [texts[i:i + batch_size] for i in range(0, len(texts), batch_size)]
+
+    # Warm-up pass
+    for batch in batches:
+        run_batch(batch)
+
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        for batch in batches:
+            run_batch(batch)
+        timings.append(time.perf_counter() - start)
+
+    best = min(timings)
+    return {
+        'batch_ms': best / len(batches) * 1000,
+        'logs_per_sec': len(texts) / best
+    }
+
+
+def load_test_sequences(pattern=os.path.join(BASE_DIR, '..', 'test_data', '*.csv')):
+    """Behavior sequences from the bundled test CSVs"""
+    from model.preprocessor import preprocessor
+
+    sequences = []
+    for path in sorted(glob.glob(pattern)):
+        with open(path, newline='', encoding='utf-8') as f:
+            sequences.extend(log['sequence'] for log in preprocessor.process_csv(f.read()))
+    return sequences
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Export the threat detection model to ONNX')
+    parser.add_argument('--weights', default=Config.MODEL_PATH, help='fine-tuned .pth weights to export')
+    parser.add_argument('--output', default=Config.ONNX_MODEL_PATH)
+    parser.add_argument('--batch-size', type=int, default=Config.INFERENCE_BATCH_SIZE)
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    from model.transformer_model import ThreatDetector
+
+    # Always export from the PyTorch model
+    Config.INFERENCE_BACKEND = 'torch'
+    detector = ThreatDetector(model_path=args.weights)
+    if not detector.fine_tuned:
+        print(f"❌ No fine-tuned weights at {args.weights}, refusing to export an untrained model "
+              "(run train_model.py first)")
+        raise SystemExit(1)
+
+    print("=" * 60)
+    print(f"Exporting model to {args.output}...")
+    export_onnx(detector.model, detector.tokenizer, args.output)
+    session = create_session(args.output)
+
+    texts = load_test_sequences()
+    parity = check_parity(detector, session, texts)
+    status = '✅ PASSED' if parity['passed'] else '❌ FAILED'
+    print(f"Parity check {status}: max |logit diff| = {parity['max_abs_diff']:.2e}, "
+          f"classes match = {parity['same_classes']}")
+
+    def run_torch(batch):
+        inputs = detector.tokenizer(batch, max_length=detector.max_length, padding=True,
+                                    truncation=True, return_tensors='pt')
+        with torch.no_grad():
+            detector.model(inputs['input_ids'], inputs['attention_mask'])
+
+    def run_onnx(batch):
+        inputs = detector.tokenizer(batch, max_length=detector.max_length, padding=True,
+                                    truncation=True, return_tensors='np')
+        session.run(['logits'], {
+            'input_ids': inputs['input_ids'].astype(np.int64),
+            'attention_mask': inputs['attention_mask'].astype(np.int64)
+        })
+
+    print(f"\nBenchmark ({len(texts)} logs, batch size {args.batch_size}, "
+          f"{torch.get_num_threads()} torch threads):")
+    for name, run_batch in [('PyTorch', run_torch), ('ONNX Runtime', run_onnx)]:
+        result = benchmark(run_batch, texts, args.batch_size, args.runs)
+        print(f"  {name:<13} {result['batch_ms']:8.2f} ms/batch  {result['logs_per_sec']:10.1f} logs/sec")
+    print("=" * 60)
+
+    if not parity['passed']:
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
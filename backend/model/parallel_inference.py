@@ -0,0 +1,107 @@
+"""
+Multi-process inference for large uploads.
+
+Workers are started with the 'forkserver' method ('spawn' where that is
+unavailable), never by forking the API process: that process runs request
+and loader threads with torch loaded, and forking it can deadlock a worker
+on a lock another thread held.
+
+The weights are loaded once, by the API process. Its model is moved to
+shared memory and handed to the workers through torch.multiprocessing,
+which passes shared-memory handles rather than copies, so every worker
+maps the same weight pages and predicts with exactly the same weights
+(including an untrained head). Each worker gets its own share of the
+cores for torch intra-op threads.
+
+With INFERENCE_WORKERS=0 everything runs in-process through predict_batch.
+"""
+
+import atexit
+import os
+import threading
+
+import torch
+import torch.multiprocessing
+from config import Config
+
+_pool = None
+_pool_lock = threading.Lock()
+
+# Built by each worker in _init_worker
+_worker_detector = None
+
+
+def _init_worker(num_threads, model_path, model):
+    """Wrap the shared model and pin the worker to its share of the cores"""
+    global _worker_detector
+    from model.transformer_model import ThreatDetector
+
+    torch.set_num_threads(num_threads)
+    Config.ONNX_NUM_THREADS = num_threads
+    _worker_detector = ThreatDetector(model_path, model=model)
+
+
+def _classify_shard(texts):
+    return _worker_detector.predict_batch(texts)
+
+
+def _threads_per_worker(workers):
+    if Config.INFERENCE_WORKER_THREADS:
+        return Config.INFERENCE_WORKER_THREADS
+    return max(1, (os.cpu_count() or 1) // workers)
+
+
+def _start_method():
+    methods = torch.multiprocessing.get_all_start_methods()
+    return 'forkserver' if 'forkserver' in methods else 'spawn'
+
+
+def get_pool(detector):
+    """Create (once) the worker pool sharing ``detector``'s weights"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            if detector.model is not None:
+                detector.model.share_memory()
+
+            context = torch.multiprocessing.get_context(_start_method())
+            if context.get_start_method() == 'forkserver':
+                # Workers fork from a server that has already imported torch
+                context.set_forkserver_preload(['model.transformer_model'])
+            workers = Config.INFERENCE_WORKERS
+            _pool = context.Pool(
+                processes=workers,
+                initializer=_init_worker,
+                initargs=(_threads_per_worker(workers), Config.MODEL_PATH, detector.model)
+            )
+            atexit.register(_pool.terminate)
+            print(f"Started {workers} inference workers via {context.get_start_method()} "
+                  f"({_threads_per_worker(workers)} threads each)")
+    return _pool
+
+
+def predict_parallel(detector, texts, logs=None):
+    """Classify texts across worker processes, results in input order
+
+    ``logs`` is the number of log lines the texts were deduplicated from
+    (default ``len(texts)``). The pool is used for chunks of at least
+    PROCESS_POOL_MIN_LOGS lines, judged before deduplication so that a
+    large upload is not pushed back in-process just because its chunks
+    repeat. Texts that fit in a single shard are still classified
+    in-process, as there is nothing to split.
+    """
+    logs = len(texts) if logs is None else logs
+    if Config.INFERENCE_WORKERS <= 0 or logs < Config.PROCESS_POOL_MIN_LOGS:
+        return detector.predict_batch(texts)
+
+    # A few shards per worker keeps them busy when shards finish unevenly
+    shard_size = max(detector.batch_size, -(-len(texts) // (Config.INFERENCE_WORKERS * 4)))
+    shards = [texts[i:i + shard_size] for i in range(0, len(texts), shard_size)]
+    if len(shards) < 2:
+        return detector.predict_batch(texts)
+
+    pool = get_pool(detector)
+    results = []
+    for shard_results in pool.imap(_classify_shard, shards):
+        results.extend(shard_results)
+    return results
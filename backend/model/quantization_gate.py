@@ -0,0 +1,137 @@
+"""
+Accuracy-regression gate for int8 dynamic quantization.
+
+Compares fp32 and int8-quantized predictions on test_data/*.csv and writes
+a report. ThreatDetector only quantizes (QUANTIZE_INT8=True) when the
+report has passed for the same fine-tuned weights file, never for the
+untrained base model.
+
+Usage (from the backend directory):
+    python -m model.quantization_gate [--weights model/threat_detection_model.pth]
+"""
+
+import argparse
+import copy
+import io
+import json
+import os
+import time
+
+import torch
+from config import Config
+
+
+def weights_fingerprint(model_path=None):
+    """Identify the weights a report was produced for, None without a weights file"""
+    if model_path and os.path.exists(model_path):
+        stat = os.stat(model_path)
+        return {
+            'path': os.path.abspath(model_path),
+            'size': stat.st_size,
+            'mtime': stat.st_mtime
+        }
+    return None
+
+
+def is_quantization_approved(model_path=None, report_path=Config.QUANTIZATION_REPORT):
+    """Whether a passing gate report exists for these weights
+
+    Never true without fine-tuned weights: a randomly initialized head has
+    no stable identity, so no report can vouch for it.
+    """
+    fingerprint = weights_fingerprint(model_path)
+    if fingerprint is None:
+        return False
+
+    try:
+        with open(report_path) as f:
+            report = json.load(f)
+    except (OSError, ValueError):
+        return False
+
+    return report.get('passed') is True and report.get('weights') == fingerprint
+
+
+def model_size_mb(model):
+    """Serialized state_dict size in MB"""
+    buffer = io.BytesIO()
+    torch.save(model.state_dict(), buffer)
+    return buffer.tell() / (1024 * 1024)
+
+
+def compare_models(detector, fp32_model, int8_model, texts):
+    """Run both models over texts and measure class agreement and latency"""
+    timings = {}
+    classes = {}
+
+    for name, model in [('fp32', fp32_model), ('int8', int8_model)]:
+        detector.model = model
+        detector._run_model(texts[:detector.batch_size])  # warm-up
+        start = time.perf_counter()
+        outputs = detector._run_model(texts)
+        timings[name] = time.perf_counter() - start
+        classes[name] = [predicted_class for _, predicted_class in outputs]
+
+    detector.model = fp32_model
+    agreements = sum(a == b for a, b in zip(classes['fp32'], classes['int8']))
+
+    return {
+        'samples': len(texts),
+        'agreement': agreements / len(texts) if texts else 0.0,
+        'fp32_logs_per_sec': len(texts) / timings['fp32'],
+        'int8_logs_per_sec': len(texts) / timings['int8']
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Gate int8 quantization on prediction agreement')
+    parser.add_argument('--weights', default=Config.MODEL_PATH, help='fine-tuned .pth weights')
+    parser.add_argument('--threshold', type=float, default=Config.QUANTIZATION_MIN_AGREEMENT)
+    parser.add_argument('--report', default=Config.QUANTIZATION_REPORT)
+    args = parser.parse_args()
+
+    from model.onnx_backend import load_test_sequences
+    from model.transformer_model import ThreatDetector, quantize_model
+
+    # Build the fp32 reference on the PyTorch backend
+    Config.INFERENCE_BACKEND = 'torch'
+    Config.QUANTIZE_INT8 = False
+    detector = ThreatDetector(model_path=args.weights)
+    if not detector.fine_tuned:
+        print(f"❌ No fine-tuned weights at {args.weights}, nothing to gate (run train_model.py first)")
+        raise SystemExit(1)
+    fp32_model = detector.model
+    int8_model = quantize_model(copy.deepcopy(fp32_model))
+
+    texts = load_test_sequences()
+    result = compare_models(detector, fp32_model, int8_model, texts)
+    passed = result['agreement'] >= args.threshold
+
+    report = {
+        'weights': weights_fingerprint(args.weights),
+        'threshold': args.threshold,
+        'passed': passed,
+        'fp32_size_mb': model_size_mb(fp32_model),
+        'int8_size_mb': model_size_mb(int8_model),
+        **result
+    }
+    with open(args.report, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    print("=" * 60)
+    print(f"Samples:    {report['samples']}")
+    print(f"Agreement:  {report['agreement']:.2%} (threshold {args.threshold:.2%})")
+    print(f"Size:       {report['fp32_size_mb']:.1f} MB fp32 -> {report['int8_size_mb']:.1f} MB int8")
+    print(f"Throughput: {report['fp32_logs_per_sec']:.1f} -> {report['int8_logs_per_sec']:.1f} logs/sec")
+    if passed:
+        print(f"✅ Quantization approved, report written to {args.report}")
+    else:
+        print(f"❌ Agreement below threshold, quantization stays disabled ({args.report})")
+    print("=" * 60)
+
+    if not passed:
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,261 @@
+"""
+Online log template mining (Drain-style fixed-depth parse tree).
+
+Lines are masked (IPs, emails, numbers, ...), then routed through a tree
+keyed on the line's threat keyword hits, token count and the first few
+tokens to a small list of template clusters. A line joins the most similar
+cluster, generalizing differing positions to ``<*>``, or starts a new one.
+Classification is cached per template, so a line whose template has
+already been classified costs only the tree lookup.
+"""
+
+import hashlib
+import re
+import threading
+
+from config import Config
+
+WILDCARD = '<*>'
+
+# Variable fields masked before mining, most specific first
+_MASKS = [
+    re.compile(r'[\w.+-]+@[\w-]+\.[\w.-]+'),  # email
+    re.compile(r'\b[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}\b'),  # UUID
+    re.compile(r'\b\d{1,3}(?:\.\d{1,3}){3}(?::\d+)?\b'),  # IPv4[:port]
+    re.compile(r'\b0x[0-9a-fA-F]+\b'),  # hex
+    re.compile(r'\b\d+(?:[.:]\d+)*\b'),  # numbers, times, versions
+]
+
+
+class LogCluster:
+    """One template and the number of lines it has absorbed"""
+
+    __slots__ = ('cluster_id', 'tokens', 'size')
+
+    def __init__(self, cluster_id, tokens):
+        self.cluster_id = cluster_id
+        self.tokens = tokens
+        self.size = 1
+
+    @property
+    def template(self):
+        return ' '.join(self.tokens)
+
+
+class _Node:
+    __slots__ = ('children', 'clusters')
+
+    def __init__(self):
+        self.children = {}
+        self.clusters = []
+
+
+class TemplateMiner:
+    """Drain parse tree: (keyword hits, token count) -> leading tokens -> clusters"""
+
+    def __init__(self, depth=Config.TEMPLATE_TREE_DEPTH, sim_threshold=Config.TEMPLATE_SIM_THRESHOLD,
+                 max_children=100, max_clusters=Config.TEMPLATE_MAX_CLUSTERS):
+        self.depth = max(depth - 2, 0)  # leading-token layers below the length layer
+        self.sim_threshold = sim_threshold
+        self.max_children = max_children
+        self.max_clusters = max_clusters
+        self.root = _Node()
+        self.cluster_count = 0
+        self._cluster_ids = set()
+        self._lock = threading.Lock()
+
+    def mask(self, line):
+        """Replace variable fields with the wildcard"""
+        for pattern in _MASKS:
+            line = pattern.sub(WILDCARD, line)
+        return line
+
+    def add(self, line, keywords=()):
+        """Match line to a cluster (creating one if needed)
+
+        ``keywords`` are the threat keywords found in the line. Only lines
+        with exactly the same hits share a cluster, so wildcarding can never
+        merge a keyword-bearing line into a benign template.
+
+        Returns None once ``max_clusters`` templates exist and the line
+        matches none of them.
+        """
+        tokens = self.mask(line).split()
+        key = (tuple(sorted(keywords)), len(tokens))
+
+        with self._lock:
+            cluster = self._tree_search(key, tokens)
+            if cluster is not None:
+                cluster.tokens = [a if a == b else WILDCARD for a, b in zip(cluster.tokens, tokens)]
+                cluster.size += 1
+                return cluster
+
+            if self.cluster_count >= self.max_clusters:
+                return None
+
+            cluster = LogCluster(self._cluster_id(key, tokens), tokens)
+            self._add_to_tree(key, cluster)
+            self.cluster_count += 1
+            return cluster
+
+    def _cluster_id(self, key, tokens):
+        """Id from the routing key and the first line's masked tokens
+
+        The same lines give the same ids in every process and after a
+        restart. A repeat (a line that no longer matches its generalized
+        template) is numbered to keep ids unique.
+        """
+        seed = repr((key, tokens))
+        cluster_id = hashlib.sha1(seed.encode('utf-8')).hexdigest()[:12]
+        n = 1
+        while cluster_id in self._cluster_ids:
+            cluster_id = hashlib.sha1(f'{seed}#{n}'.encode('utf-8')).hexdigest()[:12]
+            n += 1
+        self._cluster_ids.add(cluster_id)
+        return cluster_id
+
+    def _tree_search(self, key, tokens):
+        node = self.root.children.get(key)
+        if node is None:
+            return None
+
+        for token in tokens[:self.depth]:
+            node = node.children.get(token) or node.children.get(WILDCARD)
+            if node is None:
+                return None
+
+        return self._best_match(node.clusters, tokens)
+
+    def _best_match(self, clusters, tokens):
+        best, best_key = None, (-1.0, -1)
+        for cluster in clusters:
+            same = params = 0
+            for a, b in zip(cluster.tokens, tokens):
+                if a == WILDCARD:
+                    params += 1
+                elif a == b:
+                    same += 1
+            similarity = same / len(tokens) if tokens else 1.0
+            if (similarity, params) > best_key:
+                best, best_key = cluster, (similarity, params)
+
+        if best is not None and best_key[0] >= self.sim_threshold:
+            return best
+        return None
+
+    def _add_to_tree(self, key, cluster):
+        node = self.root.children.setdefault(key, _Node())
+
+        for token in cluster.tokens[:self.depth]:
+            if any(c.isdigit() for c in token):
+                token = WILDCARD
+            if token not in node.children and len(node.children) >= self.max_children:
+                token = WILDCARD
+            node = node.children.setdefault(token, _Node())
+
+        node.clusters.append(cluster)
+
+
+class TemplateClassifier:
+    """Pipeline stage that classifies each template once"""
+
+    def __init__(self, detector, miner=None):
+        self.detector = detector
+        self.miner = miner or TemplateMiner()
+        self._results = {}  # cluster_id -> result
+        self._lock = threading.Lock()
+
+        # Counters
+        self.lines = 0
+        self.template_hits = 0
+        self.classifications = 0
+
+    def classify(self, lines, sequences):
+        """Predictions and template ids for raw lines
+
+        ``sequences`` are the lines' own behavior sequences. Each line is
+        routed on the threat keywords in its sequence, and a new template
+        is classified through the sequence of the line that first reached
+        it rather than the wildcarded template text, so every member of a
+        template has the same keyword hits as the line that was classified.
+        Lines that fit no template are classified directly.
+        """
+        clusters = self._mine(lines, sequences)
+        results = [None] * len(lines)
+        pending = {}  # cluster_id -> (sequence, [indices])
+        direct = []
+
+        with self._lock:
+            for i, cluster in enumerate(clusters):
+                if cluster is None:
+                    direct.append(i)
+                    continue
+
+                cached = self._results.get(cluster.cluster_id)
+                if cached is not None:
+                    results[i] = dict(cached)
+                    self.template_hits += 1
+                    continue
+
+                pending.setdefault(cluster.cluster_id, (sequences[i], []))[1].append(i)
+            self.lines += len(lines)
+
+        if pending:
+            predictions = self.detector.predict_batch([sequence for sequence, _ in pending.values()])
+            with self._lock:
+                for (cluster_id, (_, indices)), result in zip(pending.items(), predictions):
+                    self._results[cluster_id] = result
+                    self.classifications += 1
+                    for i in indices:
+                        results[i] = dict(result)
+
+        if direct:
+            for i, result in zip(direct, self.detector.predict_batch([sequences[i] for i in direct])):
+                results[i] = result
+
+        template_ids = [cluster.cluster_id if cluster is not None else None for cluster in clusters]
+        return results, template_ids
+
+    def template_ids(self, lines, sequences):
+        """Template ids for lines whose prediction is already known
+
+        The lines are mined like in ``classify`` but nothing is classified.
+        """
+        return [cluster.cluster_id if cluster is not None else None for cluster in self._mine(lines, sequences)]
+
+    def _mine(self, lines, sequences):
+        matcher = self.detector.keyword_matcher
+        return [
+            self.miner.add(line, matcher.matches(sequence.lower()))
+            for line, sequence in zip(lines, sequences)
+        ]
+
+    def clear_results(self):
+        """Forget template predictions, e.g. after the model changed
+
+        Mined templates and their ids are kept.
+        """
+        with self._lock:
+            self._results.clear()
+
+    def get_stats(self):
+        """Template counts and how many lines skipped the detector"""
+        with self._lock:
+            return {
+                'templates': self.miner.cluster_count,
+                'lines': self.lines,
+                'template_hits': self.template_hits,
+                'classifications': self.classifications,
+                'hit_rate': self.template_hits / self.lines if self.lines else 0.0
+            }
+
+
+# Initialize global classifier
+template_classifier = None
+
+def get_template_classifier(detector):
+    """Get or create the template classifier"""
+    global template_classifier
+    if template_classifier is None:
+        template_classifier = TemplateClassifier(detector)
+    return template_classifier
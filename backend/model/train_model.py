@@ -173,11 +173,11 @@ def train_model(epochs=10, batch_size=8, learning_rate=2e-5):
         # Save best model
         if val_acc > best_val_acc:
             best_val_acc = val_acc
-            torch.save(model.state_dict(), 'threat_detection_model.pth')
+            torch.save(model.state_dict(), Config.MODEL_PATH)
             print(f"  ✓ Saved best model (val_acc: {val_acc:.4f})")
     
     print(f"\nTraining completed! Best validation accuracy: {best_val_acc:.4f}")
-    print("Model saved as 'threat_detection_model.pth'")
+    print(f"Model saved as '{Config.MODEL_PATH}'")
 
 
 if __name__ == '__main__':
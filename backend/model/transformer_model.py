@@ -2,7 +2,14 @@ import torch
 import torch.nn as nn
 from transformers import AutoTokenizer, AutoModel
 from config import Config
+from model.batch_scheduler import MicroBatcher
+from model.fast_tokenizer import FastEncoder, pad_sequences
+from model.keyword_matcher import threat_keyword_matcher
+from model.prediction_cache import PredictionCache
 import os
+import random
+import threading
+import time
 
 class ThreatDetectionModel(nn.Module):
     """Transformer-based threat detection model"""
@@ -35,22 +42,119 @@ class ThreatDetectionModel(nn.Module):
         return logits
 
 
+def quantize_model(model):
+    """Dynamically quantize a model's Linear layers to int8 for CPU inference"""
+    return torch.quantization.quantize_dynamic(model, {nn.Linear}, dtype=torch.qint8)
+
+
 class ThreatDetector:
     """Wrapper class for threat detection inference"""
     
-    def __init__(self, model_path=None):
+    def __init__(self, model_path=None, model=None):
+        # ``model`` is an already loaded ThreatDetectionModel to use instead
+        # of building one (inference workers get the API process's weights)
         self.device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
         self.model_name = Config.MODEL_NAME
         self.max_length = Config.MAX_SEQ_LENGTH
+        self.batch_size = Config.INFERENCE_BATCH_SIZE
+        self.dynamic_padding = Config.DYNAMIC_PADDING
+        self.length_buckets = sorted(b for b in Config.LENGTH_BUCKETS if b <= self.max_length)
+        
+        # Token-length distribution (dynamic padding mode)
+        self._stats_lock = threading.Lock()
+        self.token_length_stats = {
+            'sequences': 0,
+            'batches': 0,
+            'real_tokens': 0,
+            'padded_tokens': 0,
+            'max_length': 0,
+            'buckets': {}
+        }
+        
+        # Heuristic-first cascade
+        self.cascade = Config.CASCADE_ENABLED
+        self.audit_rate = Config.CASCADE_AUDIT_RATE
+        self.tier_stats = {
+            tier: {'count': 0, 'total_ms': 0.0}
+            for tier in ('heuristic', 'model', 'audit')
+        }
+        self.audit_agreements = 0
+        self.keyword_matcher = threat_keyword_matcher()
         
         # Load tokenizer
         self.tokenizer = AutoTokenizer.from_pretrained(self.model_name)
+        self.encoder = FastEncoder(self.tokenizer, self.max_length) if Config.FAST_TOKENIZER else None
+        
+        # Load trained weights if available
+        self.fine_tuned = bool(model_path and os.path.exists(model_path))
+        self.model = None
+        self.session = None
+        self.quantized = False
+        self.backend = Config.INFERENCE_BACKEND
+        
+        if self.backend == 'onnx' and not os.path.exists(Config.ONNX_MODEL_PATH):
+            print(f"ONNX model not found at {Config.ONNX_MODEL_PATH}, falling back to PyTorch")
+            self.backend = 'torch'
+        
+        if self.backend == 'onnx':
+            from model.onnx_backend import create_session
+            self.session = create_session(Config.ONNX_MODEL_PATH, Config.ONNX_NUM_THREADS)
+            print(f"Loaded ONNX model from {Config.ONNX_MODEL_PATH}")
+        elif model is not None:
+            self.model = model
+            self.model.eval()
+        else:
+            self._load_torch_model(model_path)
         
-        # Initialize model
+        # Labels
+        self.labels = ['normal', 'suspicious', 'malicious']
+        
+        # Prediction cache, keyed on (model version, sequence)
+        self.model_version = self._compute_model_version(model_path)
+        self.cache = PredictionCache() if Config.PREDICTION_CACHE_SIZE > 0 else None
+        
+        # Coalesce concurrent predict() calls into shared forward passes
+        self.batcher = MicroBatcher(self.predict_batch) if Config.MICRO_BATCH_ENABLED else None
+    
+    def _compute_model_version(self, model_path):
+        """Identify the weights and backend that produce predictions"""
+        if self.fine_tuned:
+            weights = f"{os.path.basename(model_path)}@{int(os.path.getmtime(model_path))}"
+        else:
+            # Untrained head is randomly initialized per process
+            weights = f"pretrained@{id(self)}"
+        precision = 'int8' if self.quantized else 'fp32'
+        return f"{self.model_name}:{weights}:{self.backend}:{precision}"
+    
+    def invalidate_cache(self, model_path=None):
+        """Drop cached predictions after the model has changed"""
+        self.model_version = self._compute_model_version(model_path)
+        if self.cache is not None:
+            self.cache.clear()
+    
+    def get_batcher_stats(self):
+        """Micro-batching metrics (None when micro-batching is disabled)"""
+        if self.batcher is None:
+            return None
+        return self.batcher.get_stats()
+    
+    def get_encoder_stats(self):
+        """Fast encoder memo counters (None when disabled)"""
+        if self.encoder is None:
+            return None
+        return self.encoder.get_stats()
+    
+    def get_cache_stats(self):
+        """Prediction cache counters (None when the cache is disabled)"""
+        if self.cache is None:
+            return None
+        return {**self.cache.get_stats(), 'model_version': self.model_version}
+    
+    def _load_torch_model(self, model_path):
+        """Build the PyTorch model and load fine-tuned weights if present"""
         self.model = ThreatDetectionModel(self.model_name)
         
-        # Load trained weights if available
-        if model_path and os.path.exists(model_path):
+        if self.fine_tuned:
             self.model.load_state_dict(torch.load(model_path, map_location=self.device))
             print(f"Loaded model from {model_path}")
         else:
@@ -61,8 +165,24 @@ class ThreatDetector:
         self.model.to(self.device)
         self.model.eval()
         
-        # Labels
-        self.labels = ['normal', 'suspicious', 'malicious']
+        if Config.QUANTIZE_INT8:
+            self._quantize_if_approved(model_path)
+    
+    def _quantize_if_approved(self, model_path):
+        """Swap in an int8 model if the quantization gate has passed for these weights"""
+        from model.quantization_gate import is_quantization_approved
+        
+        if self.device.type != 'cpu':
+            print("Int8 quantization is CPU only, keeping fp32 model")
+        elif not self.fine_tuned:
+            print("Int8 quantization needs fine-tuned weights, keeping fp32 model")
+        elif not is_quantization_approved(model_path):
+            print("Int8 quantization not approved for these weights "
+                  "(run: python -m model.quantization_gate), keeping fp32 model")
+        else:
+            self.model = quantize_model(self.model)
+            self.quantized = True
+            print("Using int8 dynamically quantized model")
     
     def _init_simple_classifier(self):
         """Initialize classifier with simple weights for demo"""
@@ -71,24 +191,36 @@ class ThreatDetector:
     
     def predict(self, text: str):
         """Predict threat level for a behavior sequence"""
-        # Tokenize
-        inputs = self.tokenizer(
-            text,
-            max_length=self.max_length,
-            padding='max_length',
-            truncation=True,
-            return_tensors='pt'
-        )
+        if self.batcher is not None:
+            return self.batcher.submit(text)
+        return self.predict_batch([text])[0]
+    
+    def warm_up(self):
+        """Run throwaway forward passes to fill allocator and kernel caches
         
-        input_ids = inputs['input_ids'].to(self.device)
-        attention_mask = inputs['attention_mask'].to(self.device)
+        Covers every padded width inference will use, at batch sizes 1 and
+        ``batch_size``. Bypasses the cache and statistics.
+        """
+        widths = self.length_buckets if self.dynamic_padding else [self.max_length]
+        for width in widths:
+            for size in sorted({1, self.batch_size}):
+                inputs = self.tokenizer(
+                    ['login user dashboard view logout'] * size,
+                    max_length=width,
+                    padding='max_length',
+                    truncation=True,
+                    return_tensors='pt'
+                )
+                self._forward(inputs['input_ids'], inputs['attention_mask'])
+    
+    def _build_result(self, text: str, probabilities, predicted_class: int):
+        """Turn one row of model output into a prediction dict
         
-        # Predict
-        with torch.no_grad():
-            logits = self.model(input_ids, attention_mask)
-            probabilities = torch.softmax(logits, dim=1)
-            predicted_class = torch.argmax(probabilities, dim=1).item()
-            confidence = probabilities[0][predicted_class].item()
+        The keyword rules set the label; ``decided_by`` is 'model' only when
+        it matches the model's own class and 'heuristic' when the rules
+        overrode it.
+        """
+        confidence = probabilities[predicted_class].item()
         
         # Apply heuristic rules for better demo (since model isn't trained)
         prediction, score = self._apply_heuristics(text, predicted_class, confidence)
@@ -96,30 +228,29 @@ class ThreatDetector:
         return {
             'prediction': prediction,
             'score': score,
-            'probabilities': {
-                'normal': float(probabilities[0][0]),
-                'suspicious': float(probabilities[0][1]),
-                'malicious': float(probabilities[0][2])
-            }
+            'probabilities': self._probabilities_dict(probabilities),
+            'decided_by': 'model' if prediction == self.labels[predicted_class] else 'heuristic'
         }
     
+    def _probabilities_dict(self, probabilities):
+        """Map one row of softmax output to label names"""
+        return {
+            'normal': float(probabilities[0]),
+            'suspicious': float(probabilities[1]),
+            'malicious': float(probabilities[2])
+        }
+    
+    def _count_keywords(self, text: str):
+        """Count distinct malicious and suspicious keywords in text"""
+        counts = self.keyword_matcher.count(text.lower())
+        return counts['malicious'], counts['suspicious']
+    
     def _apply_heuristics(self, text: str, predicted_class: int, confidence: float):
         """Apply rule-based heuristics for better predictions"""
-        text_lower = text.lower()
-        
-        # Malicious keywords
-        malicious_keywords = ['delete', 'admin', 'root', 'sudo', 'export', 'database', 
-                             'privilege', 'escalation', 'unauthorized', 'brute']
-        
-        # Suspicious keywords
-        suspicious_keywords = ['failed', 'denied', 'attempt', 'retry', 'error', 
-                              'forbidden', 'multiple']
-        
-        # Count keyword matches
-        malicious_count = sum(1 for kw in malicious_keywords if kw in text_lower)
-        suspicious_count = sum(1 for kw in suspicious_keywords if kw in text_lower)
-        
-        # Determine prediction based on heuristics
+        return self._heuristic_decision(*self._count_keywords(text))
+    
+    def _heuristic_decision(self, malicious_count: int, suspicious_count: int):
+        """Map keyword counts to a (prediction, score) pair"""
         if malicious_count >= 2:
             return 'malicious', min(0.75 + (malicious_count * 0.05), 0.98)
         elif malicious_count >= 1 and suspicious_count >= 1:
@@ -131,12 +262,256 @@ class ThreatDetector:
         else:
             return 'normal', max(0.60 - (malicious_count * 0.1), 0.40)
     
-    def predict_batch(self, texts: list):
-        """Predict threat levels for multiple sequences"""
-        results = []
-        for text in texts:
-            results.append(self.predict(text))
+    def _rules_decide(self, malicious_count: int, suspicious_count: int) -> bool:
+        """Whether the keyword rules are conclusive on their own
+        
+        Two or more malicious hits, or any suspicious hit, map to a firm
+        class. No hits at all, or a lone malicious keyword, are ambiguous
+        and go to the transformer.
+        """
+        return malicious_count >= 2 or suspicious_count >= 1
+    
+    def predict_batch(self, texts: list, batch_size: int = None):
+        """Predict threat levels for multiple sequences
+        
+        Texts are tokenized together and run through the model in chunks of
+        ``batch_size`` (defaults to ``Config.INFERENCE_BATCH_SIZE``), one
+        forward pass per chunk. Results are returned in input order.
+        
+        With ``Config.CASCADE_ENABLED`` the keyword rules run first and only
+        ambiguous texts (plus a sampled audit fraction) reach the model.
+        Without fine-tuned weights every text is decided by the rules.
+        Each result records the tier that decided it in ``decided_by``.
+        
+        When the prediction cache is enabled, results are looked up by
+        (model version, sequence) first and only misses are computed, once
+        per distinct sequence.
+        """
+        if not texts:
+            return []
+        
+        if self.cache is None:
+            return self._predict_uncached(texts, batch_size)
+        
+        results = [None] * len(texts)
+        misses = {}  # sequence -> indices still to fill
+        for i, text in enumerate(texts):
+            cached = self.cache.get((self.model_version, text))
+            if cached is not None:
+                results[i] = dict(cached)
+            else:
+                misses.setdefault(text, []).append(i)
+        
+        if misses:
+            unique = list(misses)
+            for text, result in zip(unique, self._predict_uncached(unique, batch_size)):
+                self.cache.put((self.model_version, text), result)
+                for i in misses[text]:
+                    results[i] = dict(result)
+        
         return results
+    
+    def _predict_uncached(self, texts: list, batch_size: int = None):
+        """Run the cascade or the model over texts, bypassing the cache"""
+        if self.cascade:
+            return self._predict_cascade(texts, batch_size)
+        
+        start = time.perf_counter()
+        results = [
+            self._build_result(text, probabilities, predicted_class)
+            for text, (probabilities, predicted_class) in zip(texts, self._run_model(texts, batch_size))
+        ]
+        elapsed = time.perf_counter() - start
+        
+        # Split the forward pass time by which tier set each label
+        overridden = sum(1 for result in results if result['decided_by'] == 'heuristic')
+        self._record_tier('model', len(texts) - overridden, elapsed * (len(texts) - overridden) / len(texts))
+        self._record_tier('heuristic', overridden, elapsed * overridden / len(texts))
+        return results
+    
+    def _run_model(self, texts: list, batch_size: int = None):
+        """Return (probabilities, predicted_class) per text, in input order"""
+        batch_size = batch_size or self.batch_size
+        outputs = [None] * len(texts)
+        
+        for indices, input_ids, attention_mask in self._iter_batches(texts, batch_size):
+            probabilities, predicted_classes = self._forward(input_ids, attention_mask)
+            for row, i in enumerate(indices):
+                outputs[i] = (probabilities[row], predicted_classes[row])
+        
+        return outputs
+    
+    def _predict_cascade(self, texts: list, batch_size: int = None):
+        """Keyword rules first, transformer only for undecided texts"""
+        results = [None] * len(texts)
+        undecided = []
+        audited = []
+        
+        start = time.perf_counter()
+        all_counts = self.keyword_matcher.count_batch([text.lower() for text in texts])
+        for i, keyword_counts in enumerate(all_counts):
+            counts = keyword_counts['malicious'], keyword_counts['suspicious']
+            # An untrained head would be overridden by the rules anyway
+            if not self.fine_tuned or self._rules_decide(*counts):
+                prediction, score = self._heuristic_decision(*counts)
+                results[i] = {
+                    'prediction': prediction,
+                    'score': score,
+                    'probabilities': None,
+                    'decided_by': 'heuristic'
+                }
+                if self.audit_rate and random.random() < self.audit_rate:
+                    audited.append(i)
+            else:
+                undecided.append(i)
+        self._record_tier('heuristic', len(texts) - len(undecided), time.perf_counter() - start)
+        
+        if not undecided and not audited:
+            return results
+        
+        indices = undecided + audited
+        start = time.perf_counter()
+        outputs = self._run_model([texts[i] for i in indices], batch_size)
+        elapsed = time.perf_counter() - start
+        
+        agreements = 0
+        for i, (probabilities, predicted_class) in zip(indices, outputs):
+            if results[i] is None:
+                results[i] = self._model_decision(probabilities, predicted_class)
+            else:
+                # Audit: keep the rule verdict, attach what the model thought
+                results[i]['probabilities'] = self._probabilities_dict(probabilities)
+                results[i]['audited'] = True
+                agreements += self.labels[predicted_class] == results[i]['prediction']
+        
+        # Split the shared forward pass time between the two tiers
+        self._record_tier('model', len(undecided), elapsed * len(undecided) / len(indices))
+        self._record_tier('audit', len(audited), elapsed * len(audited) / len(indices))
+        with self._stats_lock:
+            self.audit_agreements += agreements
+        
+        return results
+    
+    def _model_decision(self, probabilities, predicted_class: int):
+        """Result for a text the keyword rules could not decide"""
+        return {
+            'prediction': self.labels[predicted_class],
+            'score': probabilities[predicted_class].item(),
+            'probabilities': self._probabilities_dict(probabilities),
+            'decided_by': 'model'
+        }
+    
+    def _record_tier(self, tier: str, count: int, elapsed: float):
+        """Add ``count`` results and ``elapsed`` seconds to a tier's totals"""
+        if not count:
+            return
+        with self._stats_lock:
+            self.tier_stats[tier]['count'] += count
+            self.tier_stats[tier]['total_ms'] += elapsed * 1000
+    
+    def get_tier_stats(self):
+        """Per-tier result counts and latencies"""
+        with self._stats_lock:
+            stats = {tier: dict(values) for tier, values in self.tier_stats.items()}
+            agreements = self.audit_agreements
+        for values in stats.values():
+            values['avg_ms'] = values['total_ms'] / values['count'] if values['count'] else 0.0
+        stats['audit']['agreement_rate'] = (
+            agreements / stats['audit']['count'] if stats['audit']['count'] else None
+        )
+        stats['cascade'] = self.cascade
+        return stats
+    
+    def _forward(self, input_ids, attention_mask):
+        """Run one no_grad forward pass and return (probabilities, classes)"""
+        with torch.no_grad():
+            if self.session is not None:
+                logits = torch.from_numpy(self.session.run(['logits'], {
+                    'input_ids': input_ids.numpy(),
+                    'attention_mask': attention_mask.numpy()
+                })[0])
+            else:
+                logits = self.model(input_ids.to(self.device), attention_mask.to(self.device))
+            probabilities = torch.softmax(logits, dim=1).cpu()
+            predicted_classes = torch.argmax(probabilities, dim=1).tolist()
+        return probabilities, predicted_classes
+    
+    def _iter_batches(self, texts: list, batch_size: int):
+        """Yield (indices, input_ids, attention_mask) for each batch
+        
+        With ``Config.DYNAMIC_PADDING`` off every sequence is padded to
+        ``max_length``. With it on, texts are sorted by token length so that
+        similar lengths share a batch, and each batch is padded only up to
+        the smallest ``Config.LENGTH_BUCKETS`` entry that fits its longest
+        item.
+        """
+        if not self.dynamic_padding:
+            for start in range(0, len(texts), batch_size):
+                chunk = texts[start:start + batch_size]
+                if self.encoder is not None:
+                    input_ids, attention_mask = self.encoder.encode_batch(chunk, self.max_length)
+                    input_ids, attention_mask = torch.from_numpy(input_ids), torch.from_numpy(attention_mask)
+                else:
+                    inputs = self.tokenizer(
+                        chunk,
+                        max_length=self.max_length,
+                        padding='max_length',
+                        truncation=True,
+                        return_tensors='pt'
+                    )
+                    input_ids, attention_mask = inputs['input_ids'], inputs['attention_mask']
+                yield range(start, start + len(chunk)), input_ids, attention_mask
+            return
+        
+        if self.encoder is not None:
+            encoded = [self.encoder.encode(text) for text in texts]
+        else:
+            encoded = self.tokenizer(texts, max_length=self.max_length, truncation=True)['input_ids']
+        order = sorted(range(len(texts)), key=lambda i: len(encoded[i]))
+        
+        for start in range(0, len(order), batch_size):
+            indices = order[start:start + batch_size]
+            width = self._bucket_length(len(encoded[indices[-1]]))
+            
+            input_ids, attention_mask = pad_sequences(
+                [encoded[i] for i in indices], width, self.tokenizer.pad_token_id
+            )
+            
+            self._record_lengths([len(encoded[i]) for i in indices], width)
+            yield indices, torch.from_numpy(input_ids), torch.from_numpy(attention_mask)
+    
+    def _bucket_length(self, length: int) -> int:
+        """Smallest configured bucket that holds ``length`` tokens"""
+        for bucket in self.length_buckets:
+            if length <= bucket:
+                return bucket
+        return self.max_length
+    
+    def _record_lengths(self, lengths: list, width: int):
+        """Update the token-length distribution with one padded batch"""
+        with self._stats_lock:
+            stats = self.token_length_stats
+            stats['sequences'] += len(lengths)
+            stats['batches'] += 1
+            stats['real_tokens'] += sum(lengths)
+            stats['padded_tokens'] += width * len(lengths)
+            stats['max_length'] = max(stats['max_length'], max(lengths))
+            for length in lengths:
+                bucket = self._bucket_length(length)
+                stats['buckets'][bucket] = stats['buckets'].get(bucket, 0) + 1
+    
+    def get_token_length_stats(self):
+        """Token-length distribution seen by dynamic-padding inference"""
+        with self._stats_lock:
+            stats = dict(self.token_length_stats)
+            stats['buckets'] = {str(k): v for k, v in sorted(stats['buckets'].items())}
+        sequences = stats['sequences']
+        stats['mean_length'] = stats['real_tokens'] / sequences if sequences else 0.0
+        stats['padding_ratio'] = (
+            1 - stats['real_tokens'] / stats['padded_tokens'] if stats['padded_tokens'] else 0.0
+        )
+        stats['dynamic_padding'] = self.dynamic_padding
+        return stats
 
 # Initialize global detector
 detector = None
@@ -145,5 +520,5 @@ def get_detector():
     """Get or create detector instance"""
     global detector
     if detector is None:
-        detector = ThreatDetector()
+        detector = ThreatDetector(Config.MODEL_PATH)
     return detector
@@ -0,0 +1,25 @@
+"""
+Recompute the statistics counters from the logs collection
+Run this if dashboard counts drift from the stored logs
+"""
+
+from database import db
+import sys
+
+if __name__ == '__main__':
+    print("=" * 50)
+    print("Rebuilding Log Counters")
+    print("=" * 50)
+    
+    if not db.connected:
+        print("✗ Database not connected")
+        sys.exit(1)
+    
+    count = db.rebuild_counters()
+    stats = db.get_statistics()
+    print(f"✓ Rebuilt {count} counters")
+    print(f"  Total Logs: {stats['total']}")
+    print(f"  Normal: {stats['normal']}")
+    print(f"  Suspicious: {stats['suspicious']}")
+    print(f"  Malicious: {stats['malicious']}")
+    print("=" * 50)
@@ -0,0 +1,67 @@
+"""
+Check that FastEncoder produces exactly the HF tokenizer's output
+"""
+import csv
+import glob
+import os
+
+import numpy as np
+import pytest
+from transformers import AutoTokenizer
+from config import Config
+from model.fast_tokenizer import FastEncoder
+from model.preprocessor import preprocessor
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+
+def load_sequences():
+    """Behavior sequences from every CSV shipped with the project, plus edge cases"""
+    sequences = ['', 'a', 'admin', 'x' * 150, ' '.join(['login'] * 200), 'naïve café: root!']
+    for path in sorted(glob.glob(os.path.join(ROOT, '**', '*.csv'), recursive=True)):
+        with open(path, newline='', encoding='utf-8') as f:
+            for row in csv.reader(f):
+                line = ' '.join(row)
+                sequences.append(preprocessor.extract_sequence(line))
+                sequences.append(preprocessor.clean_text(line))
+    return sequences
+
+
+def load_tokenizer():
+    """The configured HF tokenizer, or a skip when it cannot be loaded offline"""
+    try:
+        return AutoTokenizer.from_pretrained(Config.MODEL_NAME)
+    except OSError as e:
+        pytest.skip(f'Tokenizer for {Config.MODEL_NAME} unavailable: {e}')
+
+
+def test_fast_encoder_matches_hf_tokenizer():
+    tokenizer = load_tokenizer()
+    encoder = FastEncoder(tokenizer, Config.MAX_SEQ_LENGTH)
+    sequences = load_sequences()
+
+    # Per-sequence ids, run twice so the second pass is served from the memo
+    for _ in range(2):
+        for text in sequences:
+            expected = tokenizer(text, max_length=Config.MAX_SEQ_LENGTH, truncation=True)['input_ids']
+            assert encoder.encode(text) == expected, text
+
+    # Padded batch arrays
+    expected = tokenizer(sequences, max_length=Config.MAX_SEQ_LENGTH, padding='max_length',
+                         truncation=True, return_tensors='np')
+    input_ids, attention_mask = encoder.encode_batch(sequences, Config.MAX_SEQ_LENGTH)
+    assert np.array_equal(input_ids, expected['input_ids'])
+    assert np.array_equal(attention_mask, expected['attention_mask'])
+    assert encoder.get_stats()['hit_rate'] > 0
+
+
+if __name__ == '__main__':
+    print("=" * 60)
+    print("Testing FastEncoder against the HF tokenizer")
+    print("=" * 60)
+    try:
+        test_fast_encoder_matches_hf_tokenizer()
+        print(f"\n✅ SUCCESS! {len(load_sequences())} sequences encoded identically")
+    except AssertionError as e:
+        print(f"\n[FAILED] Output differs from the HF tokenizer for: {e!r}")
+    print("\n" + "=" * 60)
@@ -0,0 +1,128 @@
+"""
+Check that the log listing queries, including keyset pages, are served by
+indexes (no COLLSCAN)
+Needs a running MongoDB (MONGO_URI); uses a throwaway database
+"""
+import random
+from datetime import datetime, timedelta
+
+import pytest
+from bson import ObjectId
+
+from config import Config
+from database import Database, decode_cursor
+
+USERS = ['alice@corp.com', 'bob@corp.com', 'carol@corp.com']
+PREDICTIONS = ['normal', 'suspicious', 'malicious']
+
+
+def stages(plan):
+    """Every stage name in an explain plan tree"""
+    found = [plan['stage']] if 'stage' in plan else []
+    for key in ('inputStage', 'queryPlan'):
+        if key in plan:
+            found += stages(plan[key])
+    for child in plan.get('inputStages', []):
+        found += stages(child)
+    return found
+
+
+def winning_stages(cursor):
+    explain = cursor.explain()
+    assert 'executionStats' in explain, 'explain() returned no executionStats'
+    return stages(explain['queryPlanner']['winningPlan']), explain['executionStats']
+
+
+@pytest.fixture
+def database(monkeypatch):
+    """Database on a throwaway MongoDB database, dropped afterwards"""
+    monkeypatch.setattr(Config, 'MONGO_DB_NAME', f'{Config.MONGO_DB_NAME}_query_test')
+    db = Database()
+    yield db
+    if db.connected:
+        db.client.drop_database(db.db.name)
+
+
+def seed(db):
+    if not db.connected:
+        pytest.skip('MongoDB is not available')
+    
+    db.logs.drop()
+    db.counters.drop()
+    db._create_indexes()
+    
+    random.seed(0)
+    now = datetime.utcnow()
+    db.logs.insert_many([
+        {
+            'event': f'event {i}',
+            'sequence': f'sequence {i}',
+            'prediction': random.choice(PREDICTIONS),
+            'score': random.random(),
+            'timestamp': now - timedelta(seconds=i),
+            'user_email': random.choice(USERS)
+        }
+        for i in range(2000)
+    ])
+    return db
+
+
+def test_log_queries_use_indexes(database):
+    db = seed(database)
+    cases = {
+        'all logs': db.find_logs(limit=50),
+        'by prediction': db.find_logs(prediction='malicious', limit=50),
+        'by user': db.find_logs(user_email='alice@corp.com', limit=50),
+        'by user and prediction': db.find_logs(user_email='alice@corp.com', prediction='suspicious', limit=50),
+    }
+    for name, cursor in cases.items():
+        plan, _ = winning_stages(cursor)
+        assert 'COLLSCAN' not in plan, f'{name}: {plan}'
+        assert 'SORT' not in plan, f'{name} sorts in memory: {plan}'
+    
+    # Keyset pages after the first stay on the index
+    for filters in ({}, {'prediction': 'malicious'}, {'user_email': 'alice@corp.com'},
+                    {'user_email': 'alice@corp.com', 'prediction': 'normal'}):
+        _, cursor = db.get_logs_page(limit=100, **filters)
+        logs, _ = db.get_logs_page(limit=100, cursor=cursor, **filters)
+        timestamp, last_id = decode_cursor(cursor)
+        plan, _ = winning_stages(db.find_logs(limit=100, after=(timestamp, ObjectId(last_id)), **filters))
+        assert 'COLLSCAN' not in plan, f'page 2 {filters}: {plan}'
+        
+        expected = list(db.find_logs(limit=200, **filters))[100:200]
+        assert [log['_id'] for log in logs] == [str(log['_id']) for log in expected], filters
+    
+    # Per-user timeline is answered from the index alone
+    cursor = db.find_logs(user_email='alice@corp.com', limit=50,
+                          projection={'_id': 0, 'timestamp': 1, 'prediction': 1})
+    plan, stats = winning_stages(cursor)
+    assert 'FETCH' not in plan and 'COLLSCAN' not in plan, plan
+    assert stats['totalDocsExamined'] == 0, stats
+    
+    # Results match a plain filter
+    logs, _ = db.get_logs_page(user_email='bob@corp.com', prediction='malicious', limit=20)
+    expected = list(db.logs.find({'user_email': 'bob@corp.com', 'prediction': 'malicious'})
+                    .sort([('timestamp', -1), ('_id', -1)]).limit(20))
+    assert [log['_id'] for log in logs] == [str(log['_id']) for log in expected]
+
+
+def test_timeseries_counts_whole_first_bucket(database):
+    # Runs against MongoDB rollups when available, offline logs otherwise
+    db = database
+    if db.connected:
+        db.clear_all_logs()
+    db.save_logs_bulk([
+        {'event': f'event {i}', 'sequence': f'sequence {i}', 'prediction': PREDICTIONS[i % 3], 'score': 0.5}
+        for i in range(6)
+    ])
+    
+    # A start inside the hour of the logs, after all of them
+    start = datetime.utcnow() + timedelta(microseconds=1)
+    series = db.get_timeseries(start, start + timedelta(hours=2), granularity='hour')
+    assert series[0]['bucket'] == start.replace(minute=0, second=0, microsecond=0)
+    assert series[0]['total'] == 6, series
+    assert series[0]['malicious'] == 2, series
+
+
+if __name__ == '__main__':
+    raise SystemExit(pytest.main([__file__, '-v']))
@@ -0,0 +1,83 @@
+"""
+Check that template mining classifies every line as the direct path does
+"""
+import csv
+import glob
+import os
+
+from model.preprocessor import preprocessor
+from model.template_miner import TemplateClassifier, TemplateMiner
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+# Lines whose keywords a wildcarded template used to lose
+KEYWORD_LINES = [
+    'Failed password for alice from 10.0.0.1',
+    'Failed password for root from 10.0.0.2',
+    'User alice viewed report database summary',
+    'User alice deleted report database summary',
+    'authorized access attempt to /etc/hosts',
+    'unauthorized access attempt to /etc/passwd',
+]
+
+
+def load_lines():
+    """Lines from every CSV shipped with the project, plus keyword variants"""
+    lines = list(KEYWORD_LINES)
+    for path in sorted(glob.glob(os.path.join(ROOT, '**', '*.csv'), recursive=True)):
+        with open(path, newline='', encoding='utf-8') as f:
+            for row in csv.reader(f):
+                lines.append(' '.join(row))
+    return lines + KEYWORD_LINES
+
+
+def load_detector():
+    """Untrained detector, or a skip when the base model is unavailable"""
+    import pytest
+    from model.transformer_model import ThreatDetector
+
+    try:
+        return ThreatDetector()
+    except OSError as e:
+        pytest.skip(f'Base model unavailable: {e}')
+
+
+def test_template_predictions_match_direct():
+    detector = load_detector()
+    lines = load_lines()
+    sequences = preprocessor.extract_sequences(lines)
+
+    expected = detector.predict_batch(sequences)
+    classifier = TemplateClassifier(detector, TemplateMiner())
+    results, template_ids = [], []
+    # Chunked as in analyze_file, so later chunks hit classified templates
+    for start in range(0, len(lines), 100):
+        chunk_results, chunk_ids = classifier.classify(lines[start:start + 100], sequences[start:start + 100])
+        results.extend(chunk_results)
+        template_ids.extend(chunk_ids)
+
+    for line, result, direct in zip(lines, results, expected):
+        assert result['prediction'] == direct['prediction'], line
+    assert all(template_ids)
+    assert classifier.get_stats()['template_hits'] > 0
+
+
+def test_template_ids_are_deterministic():
+    lines = load_lines()
+    first, second = TemplateMiner(), TemplateMiner()
+    clusters = [first.add(line) for line in lines]
+
+    assert [c.cluster_id for c in clusters] == [second.add(line).cluster_id for line in lines]
+    assert len({c.cluster_id for c in clusters}) == len({id(c) for c in clusters})
+
+
+if __name__ == '__main__':
+    print("=" * 60)
+    print("Testing template mining against direct classification")
+    print("=" * 60)
+    try:
+        test_template_predictions_match_direct()
+        print("\n✅ SUCCESS! Every line classified as on the direct path")
+    except AssertionError as e:
+        print(f"\n[FAILED] Template prediction differs for: {e!r}")
+    print("\n" + "=" * 60)
@@ -0,0 +1,263 @@
+"""
+Streaming access to uploaded log files: spooling to UPLOAD_FOLDER,
+decompressing archives next to the spool and memory-mapped line reading
+"""
+import bz2
+import gzip
+import io
+import mmap
+import os
+import shutil
+import uuid
+import zipfile
+from werkzeug.utils import secure_filename
+from config import Config
+
+# Mapped pages behind the reader are released in steps of this many bytes
+_RELEASE_EVERY = 64 * 1024 * 1024
+
+# Magic numbers, checked before the filename extension
+_MAGIC = [
+    (b'\x1f\x8b', 'gzip'),
+    (b'BZh', 'bz2'),
+    (b'\x28\xb5\x2f\xfd', 'zstd'),
+    (b'PK\x03\x04', 'zip'),
+]
+
+_EXTENSIONS = {
+    '.gz': 'gzip',
+    '.gzip': 'gzip',
+    '.bz2': 'bz2',
+    '.zst': 'zstd',
+    '.zstd': 'zstd',
+    '.zip': 'zip',
+}
+
+
+class UploadTooLarge(ValueError):
+    """Upload exceeds a configured size limit"""
+
+
+class _PrefixedReader(io.RawIOBase):
+    """Replays bytes already read for sniffing before the rest of a stream"""
+
+    def __init__(self, prefix, stream):
+        self._prefix = prefix
+        self._stream = stream
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        if self._prefix:
+            n = min(len(buffer), len(self._prefix))
+            buffer[:n] = self._prefix[:n]
+            self._prefix = self._prefix[n:]
+            return n
+        data = self._stream.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+
+class _LimitedReader(io.RawIOBase):
+    """Counts bytes read through it and fails once a shared budget is spent
+
+    The budget is a one-element list so every member of an archive draws
+    from the same decompressed-size limit.
+    """
+
+    def __init__(self, stream, budget):
+        self._stream = stream
+        self._budget = budget
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        # Read one byte past the budget so overruns are detected
+        data = self._stream.read(min(len(buffer), self._budget[0] + 1))
+        self._budget[0] -= len(data)
+        if self._budget[0] < 0:
+            raise UploadTooLarge(
+                f'Decompressed upload exceeds {Config.MAX_DECOMPRESSED_SIZE} bytes'
+            )
+        buffer[:len(data)] = data
+        return len(data)
+
+
+def detect_compression(head, filename):
+    """Compression format from leading bytes, falling back to the extension"""
+    for magic, kind in _MAGIC:
+        if head.startswith(magic):
+            return kind
+
+    for extension, kind in _EXTENSIONS.items():
+        if filename.lower().endswith(extension):
+            return kind
+    return None
+
+
+def strip_compression_extension(filename):
+    """'auth.csv.gz' -> 'auth.csv'"""
+    for extension in _EXTENSIONS:
+        if filename.lower().endswith(extension):
+            return filename[:-len(extension)]
+    return filename
+
+
+def _decompressor(kind, stream):
+    if kind == 'gzip':
+        return gzip.GzipFile(fileobj=stream, mode='rb')
+    if kind == 'bz2':
+        return bz2.BZ2File(stream, mode='rb')
+    if kind == 'zstd':
+        import zstandard
+        return zstandard.ZstdDecompressor().stream_reader(stream, read_across_frames=True)
+    raise ValueError(f'Unsupported compression: {kind}')
+
+
+def iter_upload_members(stream, filename):
+    """Yield (filename, binary stream) for each log file in an upload
+
+    Plain uploads yield themselves once; gzip/bz2/zstd uploads yield one
+    decompressing stream named without the compression extension; zip
+    archives yield every file member. Data is decompressed incrementally as
+    it is read, and UploadTooLarge is raised once more than
+    MAX_DECOMPRESSED_SIZE bytes have been produced in total.
+    """
+    head = stream.read(4)
+    kind = detect_compression(head, filename)
+
+    if kind is None:
+        yield filename, io.BufferedReader(_PrefixedReader(head, stream))
+        return
+
+    budget = [Config.MAX_DECOMPRESSED_SIZE]
+
+    if kind != 'zip':
+        raw = io.BufferedReader(_PrefixedReader(head, stream))
+        member = _decompressor(kind, raw)
+        yield strip_compression_extension(filename), io.BufferedReader(_LimitedReader(member, budget))
+        return
+
+    # Zip needs the central directory at the end of the file
+    if not stream.seekable():
+        raise ValueError('Zip uploads must be seekable')
+    stream.seek(-len(head), io.SEEK_CUR)
+
+    with zipfile.ZipFile(stream) as archive:
+        members = [info for info in archive.infolist() if not info.is_dir()]
+        if len(members) > Config.MAX_ARCHIVE_MEMBERS:
+            raise UploadTooLarge(f'Archive has more than {Config.MAX_ARCHIVE_MEMBERS} files')
+        # Declared sizes can lie, so this is only an early rejection
+        if sum(info.file_size for info in members) > budget[0]:
+            raise UploadTooLarge(
+                f'Decompressed upload exceeds {Config.MAX_DECOMPRESSED_SIZE} bytes'
+            )
+
+        for info in members:
+            with archive.open(info) as member:
+                yield info.filename, io.BufferedReader(_LimitedReader(member, budget))
+
+
+def extract_upload(path, filename):
+    """Decompress a spooled upload once into files in UPLOAD_FOLDER
+
+    Returns (filename, path) for each log file: the spooled file itself
+    when it is not compressed, otherwise one file per decompressed stream
+    or zip member, after which the compressed spool is removed. Limits are
+    enforced while writing, so UploadTooLarge (or the decompressor's error
+    for a corrupt file) is raised before any of the upload is classified
+    or saved; files written so far are removed then.
+    """
+    with open(path, 'rb') as stream:
+        if detect_compression(stream.read(4), filename) is None:
+            return [(filename, path)]
+        stream.seek(0)
+
+        prefix = os.path.basename(path).split('_', 1)[0]
+        files = []
+        complete = False
+        try:
+            for name, member in iter_upload_members(stream, filename):
+                out_path = os.path.join(
+                    Config.UPLOAD_FOLDER,
+                    f'{prefix}_{len(files)}_{secure_filename(os.path.basename(name)) or "member"}'
+                )
+                files.append((name, out_path))
+                with open(out_path, 'wb') as out:
+                    shutil.copyfileobj(member, out, 1024 * 1024)
+            complete = True
+        finally:
+            if not complete:
+                for _, out_path in files:
+                    if os.path.exists(out_path):
+                        os.remove(out_path)
+
+    os.remove(path)
+    return files
+
+
+def spool_upload(file, filename):
+    """Copy an uploaded file to UPLOAD_FOLDER and return its path
+
+    The file name is prefixed with a random id so uploads never collide.
+    UploadTooLarge is raised (and the partial copy removed) past
+    MAX_UPLOAD_SIZE bytes.
+    """
+    path = os.path.join(Config.UPLOAD_FOLDER, f'{uuid.uuid4().hex}_{filename}')
+    complete = False
+    try:
+        with open(path, 'wb') as out:
+            shutil.copyfileobj(_LimitedUpload(file.stream), out, 1024 * 1024)
+        complete = True
+    finally:
+        if not complete and os.path.exists(path):
+            os.remove(path)
+    return path
+
+
+class _LimitedUpload:
+    """Upload stream that fails once MAX_UPLOAD_SIZE bytes have been read"""
+
+    def __init__(self, stream):
+        self._stream = stream
+        self._remaining = Config.MAX_UPLOAD_SIZE
+
+    def read(self, size=-1):
+        data = self._stream.read(size if size >= 0 else self._remaining + 1)
+        self._remaining -= len(data)
+        if self._remaining < 0:
+            raise UploadTooLarge(f'Upload exceeds {Config.MAX_UPLOAD_SIZE} bytes')
+        return data
+
+
+def iter_mapped_lines(path, encoding='utf-8'):
+    """Yield (offset, length, line) for each line of a file via mmap
+
+    Line boundaries are found in the mapping itself, so only one line at a
+    time is copied into a Python string; ``offset``/``length`` give the
+    line's byte span in the file. Pages already scanned are released as
+    the reader advances, keeping resident memory flat for large files.
+    """
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if not size:
+            return
+
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            if hasattr(mapped, 'madvise'):
+                mapped.madvise(mmap.MADV_SEQUENTIAL)
+            can_release = hasattr(mmap, 'MADV_DONTNEED')
+
+            position = released = 0
+            while position < size:
+                end = mapped.find(b'\n', position)
+                end = size if end == -1 else end + 1
+                yield position, end - position, mapped[position:end].decode(encoding, errors='replace')
+                position = end
+
+                if can_release and position - released >= _RELEASE_EVERY:
+                    release_to = position - position % mmap.PAGESIZE
+                    mapped.madvise(mmap.MADV_DONTNEED, released, release_to - released)
+                    released = release_to
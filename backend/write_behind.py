@@ -0,0 +1,149 @@
+"""
+Write-behind buffer for analyzed logs
+"""
+import atexit
+import queue
+import threading
+import time
+from bson import ObjectId
+from config import Config
+
+
+class WriteBehindBuffer:
+    """Queues single logs and persists them in the background in bulk
+
+    ``submit`` assigns the log's ObjectId client-side and returns at once.
+    A background thread flushes queued logs through
+    ``Database.save_logs_bulk`` as soon as ``batch_size`` logs are waiting
+    or ``flush_interval_ms`` has passed since the first one arrived. The
+    queue is bounded: when it is full, ``submit`` blocks until the writer
+    catches up. ``close`` drains the queue and is registered to run at
+    interpreter exit.
+    """
+
+    def __init__(self, database, max_queue=Config.WRITE_BEHIND_MAX_QUEUE,
+                 batch_size=Config.WRITE_BEHIND_BATCH_SIZE,
+                 flush_interval_ms=Config.WRITE_BEHIND_FLUSH_MS):
+        self.database = database
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._closed = threading.Event()
+
+        # Metrics
+        self._stats_lock = threading.Lock()
+        self.submitted = 0
+        self.written = 0
+        self.failed = 0
+        self.flushes = 0
+        self.blocked_submits = 0
+        self.max_queue_depth = 0
+        self.flush_latency_ms = {'last': 0.0, 'max': 0.0, 'total': 0.0}
+
+        self._thread = threading.Thread(target=self._run, name='write-behind', daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def submit(self, **log):
+        """Queue one log (save_log's keyword arguments) and return its id"""
+        if self._closed.is_set():
+            raise RuntimeError('Write-behind buffer is closed')
+
+        log_id = str(ObjectId())
+        log['log_id'] = log_id
+
+        try:
+            self._queue.put_nowait(log)
+        except queue.Full:
+            with self._stats_lock:
+                self.blocked_submits += 1
+            self._queue.put(log)
+
+        with self._stats_lock:
+            self.submitted += 1
+            self.max_queue_depth = max(self.max_queue_depth, self._queue.qsize())
+        return log_id
+
+    def _run(self):
+        while not (self._closed.is_set() and self._queue.empty()):
+            try:
+                batch = [self._queue.get(timeout=self.flush_interval)]
+            except queue.Empty:
+                continue
+            deadline = time.monotonic() + self.flush_interval
+
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or self._closed.is_set():
+                    # Drain without waiting once closing
+                    remaining = 0
+                try:
+                    batch.append(self._queue.get(timeout=remaining) if remaining else self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            self._flush(batch)
+
+    def _flush(self, batch):
+        start = time.perf_counter()
+        try:
+            ids = self.database.save_logs_bulk(batch)
+            failed = sum(1 for log_id in ids if log_id is None)
+        except Exception as e:
+            print(f"[WARNING] Write-behind flush of {len(batch)} logs failed: {e}")
+            failed = len(batch)
+        latency = (time.perf_counter() - start) * 1000
+
+        with self._stats_lock:
+            self.flushes += 1
+            self.written += len(batch) - failed
+            self.failed += failed
+            self.flush_latency_ms['last'] = latency
+            self.flush_latency_ms['max'] = max(self.flush_latency_ms['max'], latency)
+            self.flush_latency_ms['total'] += latency
+
+    def close(self, timeout=30):
+        """Stop accepting logs and wait for the queue to drain"""
+        if self._closed.is_set():
+            return
+        self._closed.set()
+        self._thread.join(timeout)
+        if self._queue.qsize():
+            print(f"[WARNING] Write-behind buffer closed with {self._queue.qsize()} logs unsaved")
+
+    def get_stats(self):
+        """Queue depth, throughput and flush latency"""
+        with self._stats_lock:
+            return {
+                'queue_depth': self._queue.qsize(),
+                'unflushed': self.submitted - self.written - self.failed,
+                'max_queue': self._queue.maxsize,
+                'max_queue_depth': self.max_queue_depth,
+                'batch_size': self.batch_size,
+                'flush_interval_ms': self.flush_interval * 1000,
+                'submitted': self.submitted,
+                'written': self.written,
+                'failed': self.failed,
+                'blocked_submits': self.blocked_submits,
+                'flushes': self.flushes,
+                'mean_batch_size': (self.written + self.failed) / self.flushes if self.flushes else 0.0,
+                'flush_latency_ms': {
+                    'last': self.flush_latency_ms['last'],
+                    'max': self.flush_latency_ms['max'],
+                    'mean': self.flush_latency_ms['total'] / self.flushes if self.flushes else 0.0
+                }
+            }
+
+
+# Initialize global buffer
+write_buffer = None
+_write_buffer_lock = threading.Lock()
+
+def get_write_buffer(database):
+    """Get or create the write-behind buffer"""
+    global write_buffer
+    if write_buffer is None:
+        with _write_buffer_lock:
+            if write_buffer is None:
+                write_buffer = WriteBehindBuffer(database)
+    return write_buffer
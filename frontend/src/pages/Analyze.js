@@ -170,7 +170,7 @@ function Analyze() {
                                     type="file"
                                     id="file-input"
                                     className="file-input"
-                                    accept=".csv,.txt"
+                                    accept=".csv,.txt,.log,.gz,.bz2,.zst,.zip"
                                     onChange={(e) => setFile(e.target.files[0])}
                                     required
                                 />
@@ -179,7 +179,7 @@ function Analyze() {
                                     <span className="upload-text">
                                         {file ? file.name : 'Click to select file or drag and drop'}
                                     </span>
-                                    <span className="upload-hint">CSV or TXT files (max 100 logs)</span>
+                                    <span className="upload-hint">CSV or TXT files, optionally .gz, .bz2, .zst or .zip</span>
                                 </label>
                             </div>
                         </div>
@@ -243,9 +243,9 @@ function Analyze() {
                                         ))}
                                     </tbody>
                                 </table>
-                                {fileResults.results.length > 20 && (
+                                {fileResults.total_logs > 20 && (
                                     <p className="text-muted text-center mt-2">
-                                        Showing first 20 of {fileResults.results.length} results
+                                        Showing first 20 of {fileResults.total_logs} results
                                     </p>
                                 )}
                             </div>